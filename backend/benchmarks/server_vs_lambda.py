@@ -0,0 +1,200 @@
+# backend/benchmarks/server_vs_lambda.py
+"""
+Throughput and tail latency of the Lambda handler vs the gunicorn server.
+
+Both paths serve the same app on the stubbed backends (see stub_backends.py),
+so the numbers compare serving overhead, not AuraDB or OpenAI:
+
+- lambda: main.handler (Mangum) invoked in-process with
+  API Gateway HTTP API events, one request at a time as a warm Lambda instance
+  would. Throughput at a given concurrency assumes that many warm instances;
+  API Gateway, network and cold-start time are not included.
+- server: gunicorn with gunicorn_conf.py, driven over HTTP with the given
+  number of concurrent clients.
+
+Run from the backend directory:
+    python benchmarks/server_vs_lambda.py --requests 500 --concurrency 1,8,32
+Set BENCH_LLM_LATENCY_SECONDS=0 to measure pure framework overhead on branches.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from stub_backends import BENCH_ROOT_ID, BENCH_USER_ID, TREE_SIZE, install  # noqa: E402
+from ws_connections import percentile, wait_until_up  # noqa: E402
+
+
+def scenarios():
+    """(name, method, path, body) for each request type measured."""
+    return [
+        ("graph", "GET", f"/interaction-nodes/{BENCH_ROOT_ID}/graph", None),
+        ("node", "GET", f"/interaction-nodes/{BENCH_ROOT_ID}", None),
+        (
+            "branch",
+            "POST",
+            f"/interaction-nodes/bench-{TREE_SIZE - 1}/branch",
+            {"user_prompt": "Tell me more."},
+        ),
+    ]
+
+
+def api_gateway_event(method: str, path: str, body) -> dict:
+    """An API Gateway HTTP API (payload format 2.0) event, as Lambda receives it."""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {
+            "host": "bench.execute-api.us-east-1.amazonaws.com",
+            "x-user-id": BENCH_USER_ID,
+            "accept-encoding": "gzip",
+            "content-type": "application/json",
+        },
+        "requestContext": {
+            "accountId": "000000000000",
+            "apiId": "bench",
+            "domainName": "bench.execute-api.us-east-1.amazonaws.com",
+            "http": {
+                "method": method,
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+                "userAgent": "bench",
+            },
+            "requestId": "bench",
+            "routeKey": "$default",
+            "stage": "$default",
+            "timeEpoch": int(time.time() * 1000),
+        },
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+class LambdaContext:
+    function_name = "bench"
+    aws_request_id = "bench"
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def bench_lambda(handler, method, path, body, requests: int):
+    """Latencies (ms) of `requests` sequential invocations on one warm instance."""
+    context = LambdaContext()
+    latencies = []
+    # The app logs every request with print(); keep it out of the report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        handler(api_gateway_event(method, path, body), context)  # Warm up.
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = handler(api_gateway_event(method, path, body), context)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response["statusCode"] >= 400:
+                raise RuntimeError(f"Lambda {method} {path}: {response['statusCode']}")
+    return latencies
+
+
+async def bench_server(base_url, method, path, body, requests: int, concurrency: int):
+    """Latencies (ms) and wall-clock seconds for `requests` spread over clients."""
+    headers = {"X-User-ID": BENCH_USER_ID, "Accept-Encoding": "gzip"}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits) as client:
+        await client.request(method, path, json=body)  # Warm up.
+        latencies = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - started
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        TREE_EVENTS_ENABLED="true" if workers == 1 else "false",
+        DRAIN_DELAY_SECONDS="0",
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py",
+            "--pythonpath", BENCH_DIR, "--access-logfile", "/dev/null",
+            "--log-level", "warning", "stub_app:app",
+        ],
+        cwd=os.path.dirname(BENCH_DIR),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    wait_until_up(f"http://127.0.0.1:{port}")
+    return process
+
+
+def report(path_name, scenario, concurrency, latencies, seconds):
+    print(
+        f"{path_name:>8} {scenario:>7} {concurrency:>5} "
+        f"{len(latencies) / seconds:>9.1f} "
+        f"{statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{'path':>8} {'request':>7} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        install()
+        import main as app_module
+
+    for name, method, path, body in scenarios():
+        latencies = bench_lambda(app_module.handler, method, path, body, args.requests)
+        busy_seconds = sum(latencies) / 1000
+        for concurrency in levels:
+            # Warm instances don't share CPU, so throughput scales with their count.
+            report("lambda", name, concurrency, latencies, busy_seconds / concurrency)
+
+    server = start_server(args.port, args.workers)
+    try:
+        for name, method, path, body in scenarios():
+            for concurrency in levels:
+                latencies, seconds = asyncio.run(
+                    bench_server(
+                        f"http://127.0.0.1:{args.port}",
+                        method, path, body, args.requests, concurrency,
+                    )
+                )
+                report(f"server/{args.workers}", name, concurrency, latencies, seconds)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# backend/benchmarks/stub_app.py
+# ASGI entry point for servers started by the benchmarks, e.g.
+#   uvicorn --app-dir benchmarks stub_app:app
+from stub_backends import install
+
+app = install()
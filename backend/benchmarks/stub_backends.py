@@ -0,0 +1,92 @@
+# backend/benchmarks/stub_backends.py
+"""
+Stubbed Neo4j and LLM backends for the benchmarks, so they measure the API's
+own serving overhead rather than AuraDB or OpenAI. Neo4j is replaced by the
+in-memory connection used by the tests and the LLM by a fixed-latency stub.
+Every process seeds the same tree, so any worker can serve any read.
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "tests")]
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import main  # noqa: E402
+from fake_neo4j import FakeNeo4jConnection  # noqa: E402
+from graph_service import GraphDBService  # noqa: E402
+
+BENCH_USER_ID = "bench-user"
+BENCH_ROOT_ID = "bench-root"
+LLM_LATENCY_SECONDS = float(os.environ.get("BENCH_LLM_LATENCY_SECONDS", "0.05"))
+TREE_SIZE = int(os.environ.get("BENCH_TREE_SIZE", "50"))
+
+
+class StubLLMClient:
+    """Answers every completion after a fixed delay, like a warm upstream."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    async def create_chat_completion(self, messages, on_delta=None, **kwargs):
+        await asyncio.sleep(self.latency_seconds)
+        content = "A stubbed answer to the question. " * 20
+        if on_delta is not None:
+            await on_delta(content, 0)
+        return SimpleNamespace(
+            model="stub",
+            usage=SimpleNamespace(
+                prompt_tokens=400,
+                completion_tokens=120,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+            ),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        )
+
+
+def seed_tree(conn: FakeNeo4jConnection, size: int):
+    """A tree of `size` nodes rooted at BENCH_ROOT_ID, four children per node."""
+    ids = [BENCH_ROOT_ID] + [f"bench-{i}" for i in range(1, size)]
+    ancestors = {BENCH_ROOT_ID: []}
+    for i, node_id in enumerate(ids):
+        if i:
+            parent_id = ids[(i - 1) // 4]
+            ancestors[node_id] = ancestors[parent_id] + [parent_id]
+            conn.add_edge(parent_id, node_id)
+        conn.add_node(
+            node_id,
+            user_id=BENCH_USER_ID,
+            root_id=BENCH_ROOT_ID,
+            depth=len(ancestors[node_id]),
+            ancestor_ids=ancestors[node_id],
+            revision=1,
+            is_starting_node=i == 0,
+            llm_response=f"Answer {i}. " + "Some explanation of the topic. " * 30,
+        )
+    conn.nodes[BENCH_ROOT_ID]["tree_revision"] = 1
+
+
+def install():
+    """Points main.app at the stubs and returns it."""
+    conn = FakeNeo4jConnection()
+    conn.queries = deque(maxlen=100)  # Only kept for tests; don't grow forever.
+    seed_tree(conn, TREE_SIZE)
+
+    main.llm_client = StubLLMClient(LLM_LATENCY_SECONDS)
+    main.get_db_connection = lambda: None
+    main.close_db_connection = lambda: None
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+
+    @main.app.post("/_bench/publish/{root_id}")
+    async def bench_publish(root_id: str, count: int = 1):
+        for seq in range(count):
+            await main.publish_tree_event(
+                root_id, "bench", {"seq": seq, "sent_at": time.time()}
+            )
+        return {"published": count}
+
+    return main.app
@@ -0,0 +1,174 @@
+# backend/benchmarks/ws_connections.py
+"""
+How many /ws/trees/{root_id} connections can one worker serve?
+
+Starts one uvicorn worker on the stubbed backends (see stub_backends.py),
+opens WebSocket subscriptions to one tree in steps, and at each step publishes
+events and measures how long they take to reach every subscriber, plus the
+worker's resident memory per connection.
+
+Run from the backend directory:
+    python benchmarks/ws_connections.py --levels 100,500,1000,2000
+The client shares the machine with the worker, so at high levels it competes
+for CPU; pass --url to target a worker started elsewhere (memory is then not
+reported).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from stub_backends import BENCH_ROOT_ID, BENCH_USER_ID  # noqa: E402
+
+
+def start_worker(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn",
+            "--app-dir", BENCH_DIR, "stub_app:app",
+            "--port", str(port), "--workers", "1", "--log-level", "warning",
+        ],
+        cwd=os.path.dirname(BENCH_DIR),
+    )
+    wait_until_up(f"http://127.0.0.1:{port}")
+    return process
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{base_url}/healthz", timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def publish(base_url: str):
+    def post():
+        request = urllib.request.Request(
+            f"{base_url}/_bench/publish/{BENCH_ROOT_ID}?count=1", method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+
+    await asyncio.to_thread(post)
+
+
+async def receive_one(connection, timeout: float):
+    try:
+        message = await asyncio.wait_for(connection.recv(), timeout)
+    except (asyncio.TimeoutError, websockets.ConnectionClosed):
+        return None
+    received_at = time.time()
+    sent_at = json.loads(message)["data"]["sent_at"]
+    return (received_at - sent_at) * 1000
+
+
+async def run(base_url: str, levels, events: int, pid=None):
+    ws_url = base_url.replace("http", "ws", 1)
+    url = f"{ws_url}/ws/trees/{BENCH_ROOT_ID}?user_id={BENCH_USER_ID}"
+    connections = []
+    failed = 0
+    baseline_rss = rss_mb(pid) if pid else None
+
+    print(
+        f"{'conns':>7} {'failed':>6} {'rss MB':>8} {'KB/conn':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'delivered':>9}"
+    )
+    for level in levels:
+        while len(connections) + failed < level:
+            batch = min(100, level - len(connections) - failed)
+            results = await asyncio.gather(
+                *(websockets.connect(url, max_queue=None) for _ in range(batch)),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    failed += 1
+                else:
+                    connections.append(result)
+
+        latencies = []
+        missed = 0
+        for _ in range(events):
+            receivers = [receive_one(c, timeout=10) for c in connections]
+            await publish(base_url)
+            for latency in await asyncio.gather(*receivers):
+                if latency is None:
+                    missed += 1
+                else:
+                    latencies.append(latency)
+
+        expected = events * len(connections)
+        rss = rss_mb(pid) if pid else None
+        per_conn = (
+            (rss - baseline_rss) * 1024 / len(connections)
+            if rss is not None and connections
+            else float("nan")
+        )
+        print(
+            f"{len(connections):>7} {failed:>6} "
+            f"{(rss if rss is not None else float('nan')):>8.1f} {per_conn:>8.1f} "
+            f"{(statistics.median(latencies) if latencies else float('nan')):>8.1f} "
+            f"{(percentile(latencies, 99) if latencies else float('nan')):>8.1f} "
+            f"{(expected - missed) / expected if expected else 0:>9.1%}"
+        )
+
+    await asyncio.gather(*(c.close() for c in connections), return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", default="100,500,1000,2000")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="Benchmark an already running worker instead.")
+    args = parser.parse_args()
+
+    # Every connection is a file descriptor on both ends.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    levels = [int(level) for level in args.levels.split(",")]
+    if args.url:
+        asyncio.run(run(args.url.rstrip("/"), levels, args.events))
+        return
+    worker = start_worker(args.port)
+    try:
+        asyncio.run(
+            run(f"http://127.0.0.1:{args.port}", levels, args.events, pid=worker.pid)
+        )
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# backend/blob_store.py
+"""
+Content-addressed, compressed storage for large text bodies (LLM responses and
+serialized context messages) that would otherwise be stored inline on Neo4j
+nodes. Blobs are keyed by the SHA-256 of their uncompressed UTF-8 bytes, so
+identical bodies are stored once.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; fall back to gzip
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Characters of a body kept inline on the node when the rest is offloaded.
+PREVIEW_LENGTH = 200
+
+
+def compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes) -> bytes:
+    # The frame magic identifies the codec, so stores written with either
+    # codec stay readable whether or not zstandard is installed.
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    return data
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_preview(text: str) -> str:
+    return text if len(text) <= PREVIEW_LENGTH else text[:PREVIEW_LENGTH] + "…"
+
+
+class BlobBackend(ABC):
+    """Raw byte storage for compressed blobs, addressed by content hash."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the stored bytes for key, or None if there is no such blob."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        """Stores data under key, replacing any existing blob atomically."""
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class FilesystemBlobBackend(BlobBackend):
+    """Stores blobs as files under root_dir, sharded by the first hash bytes."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key[:2], key[2:4], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never observe a partially written blob.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+
+class S3BlobBackend(BlobBackend):
+    """Stores blobs in an S3-compatible bucket (endpoint_url allows non-AWS stores)."""
+
+    def __init__(
+        self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None
+    ):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self._client = boto3.session.Session().client(
+            service_name="s3", endpoint_url=endpoint_url
+        )
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self._client.get_object(
+                Bucket=self.bucket, Key=self.prefix + key
+            )
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes):
+        self._client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except self._client_error:
+            return False
+
+
+class BlobStore:
+    """
+    Compressing, deduplicating text store over a BlobBackend, with an LRU cache
+    of decompressed bodies in front of it.
+    """
+
+    def __init__(
+        self,
+        backend: BlobBackend,
+        cache_size: int = 1024,
+        offload_min_chars: int = 1024,
+        max_fetch_workers: int = 8,
+    ):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.offload_min_chars = offload_min_chars
+        self.max_fetch_workers = max_fetch_workers
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def should_offload(self, text: Optional[str]) -> bool:
+        return text is not None and len(text) >= self.offload_min_chars
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+            return text
+
+    def _cache_put(self, key: str, text: str):
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put_text(self, text: str) -> str:
+        """Stores text (once per distinct content) and returns its hash."""
+        key = content_hash(text)
+        if self._cache_get(key) is None and not self.backend.exists(key):
+            self.backend.put(key, compress(text.encode("utf-8")))
+        self._cache_put(key, text)
+        return key
+
+    def get_text(self, key: str) -> Optional[str]:
+        text = self._cache_get(key)
+        if text is not None:
+            return text
+        data = self.backend.get(key)
+        if data is None:
+            return None
+        text = decompress(data).decode("utf-8")
+        self._cache_put(key, text)
+        return text
+
+    def get_texts(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Fetches many bodies at once: cache hits are served directly and the
+        misses are fetched from the backend concurrently. Missing blobs are
+        left out of the result.
+        """
+        results = {}
+        misses = []
+        for key in set(keys):
+            text = self._cache_get(key)
+            if text is not None:
+                results[key] = text
+            else:
+                misses.append(key)
+
+        if len(misses) == 1:
+            text = self.get_text(misses[0])
+            if text is not None:
+                results[misses[0]] = text
+        elif misses:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_fetch_workers, len(misses))
+            ) as pool:
+                for key, text in zip(misses, pool.map(self.get_text, misses)):
+                    if text is not None:
+                        results[key] = text
+        return results
+
+
+def create_blob_store_from_env() -> Optional[BlobStore]:
+    """
+    Builds the configured BlobStore, or returns None when BLOB_STORE_BACKEND is
+    unset, in which case bodies stay inline on the nodes.
+    """
+    backend_name = os.environ.get("BLOB_STORE_BACKEND", "").lower()
+    if not backend_name:
+        return None
+    if backend_name == "fs":
+        # Offloaded bodies exist nowhere else, so there is deliberately no
+        # default: a path under /tmp would silently lose them on restart.
+        root_dir = os.environ.get("BLOB_STORE_PATH")
+        if not root_dir:
+            raise ValueError("BLOB_STORE_BACKEND=fs requires BLOB_STORE_PATH.")
+        backend = FilesystemBlobBackend(root_dir)
+    elif backend_name == "s3":
+        backend = S3BlobBackend(
+            bucket=os.environ["BLOB_STORE_BUCKET"],
+            prefix=os.environ.get("BLOB_STORE_PREFIX", ""),
+            endpoint_url=os.environ.get("BLOB_STORE_ENDPOINT_URL") or None,
+        )
+    else:
+        raise ValueError(f"Unknown BLOB_STORE_BACKEND '{backend_name}'.")
+    return BlobStore(
+        backend,
+        cache_size=int(os.environ.get("BLOB_CACHE_SIZE", "1024")),
+        offload_min_chars=int(os.environ.get("BLOB_OFFLOAD_MIN_CHARS", "1024")),
+    )
@@ -0,0 +1,153 @@
+# backend/compression.py
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from http_cache import ENCODING_ETAG_SUFFIXES
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/")
+
+
+def _parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+    return accepted
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """True if the Accept-Encoding header allows the given content-coding."""
+    return _parse_accept_encoding(accept_encoding or "").get(encoding, 0) > 0
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the best supported content-coding from an Accept-Encoding header,
+    preferring brotli over gzip when both are acceptable.
+    """
+    accepted = _parse_accept_encoding(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that gzip- or brotli-compresses buffered HTTP responses
+    whose body is at least `minimum_size` bytes. Strong ETags set by the
+    endpoints get an encoding suffix so each representation stays distinct.
+    A 304 carries the validator of the representation the client revalidated,
+    so it matches the 200 that client cached.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_encoded(
+                start_message,
+                b"".join(body_parts),
+                encoding,
+                request_headers.get("if-none-match", ""),
+                send,
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def _send_encoded(
+        self, start_message, body: bytes, encoding: str, if_none_match: str, send
+    ):
+        headers = MutableHeaders(raw=start_message["headers"])
+        content_type = headers.get("content-type", "")
+        should_compress = (
+            len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and start_message["status"] not in (204, 304)
+            and content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+        )
+
+        encoded_etag = _encoded_etag(headers.get("etag"), encoding)
+        if should_compress:
+            body = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            if encoded_etag:
+                headers["ETag"] = encoded_etag
+        elif start_message["status"] == 304 and encoded_etag:
+            # Small bodies go out uncompressed with the bare ETag, so only the
+            # client's own If-None-Match says which representation it holds.
+            candidates = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+            if encoded_etag in candidates:
+                headers["ETag"] = encoded_etag
+        if start_message["status"] != 204 and "accept-encoding" not in (
+            headers.get("vary", "").lower()
+        ):
+            headers.add_vary_header("Accept-Encoding")
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
+
+
+def _encoded_etag(etag: Optional[str], encoding: str) -> Optional[str]:
+    """The ETag of the `encoding` representation, or None if it has none."""
+    if not etag or not etag.endswith('"') or etag.startswith("W/"):
+        return None
+    suffix = next(s for s in ENCODING_ETAG_SUFFIXES if s[1:] == encoding)
+    return f'{etag[:-1]}{suffix}"'
@@ -7,6 +7,9 @@ from botocore.exceptions import ClientError
 
 SECRET_NAME_OR_ARN = os.environ.get("SECRET_NAME_OR_ARN")
 AWS_REGION_NAME = os.environ.get("AWS_REGION")
+# Connections per process. The driver is shared by every request a worker
+# serves, so this bounds that worker's concurrent queries.
+NEO4J_MAX_POOL_SIZE = int(os.environ.get("NEO4J_MAX_POOL_SIZE", "100"))
 
 
 # --- Global Neo4j Driver Variable ---
@@ -19,13 +22,41 @@ class Neo4jConnection:
         # Initialize the Neo4j driver
         # This driver instance is thread-safe and typically created once per application
         self._driver = GraphDatabase.driver(
-            uri, auth=basic_auth(user, password), max_connection_lifetime=3600
+            uri,
+            auth=basic_auth(user, password),
+            max_connection_lifetime=3600,
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
         )
 
     def close(self):
         if self._driver is not None:
             self._driver.close()
 
+    def verify_connectivity(self):
+        """Raises if the driver cannot currently reach the database."""
+        assert self._driver is not None, "Driver not initialized!"
+        self._driver.verify_connectivity()
+
+    def write_transaction(self, work, db=None):
+        """
+        Runs work(tx) in a single managed write transaction and returns its
+        result. The driver may retry work on transient errors, so it must only
+        touch the database through tx.
+        """
+        assert self._driver is not None, "Driver not initialized!"
+        session = (
+            self._driver.session(database=db)
+            if db is not None
+            else self._driver.session()
+        )
+        try:
+            return session.execute_write(work)
+        except Exception as e:
+            print(f"Transaction failed: {e}")
+            raise
+        finally:
+            session.close()
+
     def query(self, query, parameters=None, db=None):
         assert self._driver is not None, "Driver not initialized!"
         session = None
@@ -1,16 +1,143 @@
 # backend/graph_service.py
+import asyncio
 import json
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
 
 from db import Neo4jConnection  # Import your Neo4j connection class
+from blob_store import BlobStore, make_preview
 import models  # Import your Pydantic models
+import read_model
+
+# Upper bound on nodes deleted per transaction when pruning a subtree.
+PRUNE_BATCH_SIZE = 500
+
+# InteractionNode properties returned by every node read. A *_blob hash marks a
+# field that holds only a preview; _hydrate_bodies swaps in the full body.
+NODE_FIELDS = (
+    "node_id", "user_prompt", "llm_response", "timestamp", "summary_title",
+    "is_starting_node", "user_id", "context_messages",
+    "root_id", "depth", "ancestor_ids", "revision",
+    "prompt_version", "llm_model", "prompt_tokens", "completion_tokens",
+    "cached_tokens", "llm_latency_ms",
+    "llm_response_blob", "context_messages_blob",
+)
+
+
+def node_projection(var: str) -> str:
+    """Cypher map projection of NODE_FIELDS for the node bound to `var`."""
+    return var + " {" + ", ".join("." + field for field in NODE_FIELDS) + "}"
+
+
+def _normalize_node_dict(node_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a node's raw property values into what the Pydantic model expects,
+    in place: context_messages from its JSON string, timestamp to a datetime.
+    """
+    if node_dict.get("context_messages") and isinstance(
+        node_dict["context_messages"], str
+    ):
+        node_dict["context_messages"] = json.loads(node_dict["context_messages"])
+    if "timestamp" in node_dict and not isinstance(node_dict["timestamp"], datetime):
+        if hasattr(node_dict["timestamp"], "to_native"):
+            node_dict["timestamp"] = node_dict["timestamp"].to_native()
+        else:
+            print(
+                f"Warning: Node timestamp type unknown or not auto-converted for node {node_dict.get('node_id')}"
+            )
+    return node_dict
+
+
+class RevisionConflictError(Exception):
+    """Raised when an update's expected_revision no longer matches the stored node."""
 
 
 class GraphDBService:
-    def __init__(self, db_connection: Neo4jConnection):
+    def __init__(
+        self,
+        db_connection: Neo4jConnection,
+        blob_store: Optional[BlobStore] = None,
+        read_model_enabled: bool = False,
+    ):
         self.db_conn = db_connection
+        self.blob_store = blob_store
+        # Maintain the per-tree read model (see read_model.py) on creates.
+        self.read_model_enabled = read_model_enabled
+
+    def _offload_body(self, field: str, text: Optional[str]) -> Dict[str, Any]:
+        """
+        Returns the node properties for a large text field. With a blob store
+        configured, bodies over its threshold are stored there and the node
+        keeps only a short preview in `field` plus the hash in `<field>_blob`.
+        Writing the full property set also clears a stale hash when a body
+        shrinks below the threshold.
+        """
+        if self.blob_store is None or not self.blob_store.should_offload(text):
+            return {field: text, f"{field}_blob": None}
+        # A truncated JSON document is useless, so serialized fields keep no preview.
+        preview = None if field == "context_messages" else make_preview(text)
+        return {field: preview, f"{field}_blob": self.blob_store.put_text(text)}
+
+    async def _hydrate_bodies(self, node_dicts: List[Dict[str, Any]]):
+        """
+        Replaces previews with full bodies from the blob store, in place, with
+        one batched fetch for all the given nodes, run off the event loop.
+        Hydrated fields lose their `<field>_blob` hash; a field whose blob is
+        missing keeps its preview and hash.
+        """
+        blob_fields = ("llm_response", "context_messages")
+        keys = [
+            node_dict.get(f"{field}_blob")
+            for node_dict in node_dicts
+            for field in blob_fields
+            if node_dict.get(f"{field}_blob")
+        ]
+        bodies = {}
+        if keys:
+            if self.blob_store is None:
+                print("Warning: Nodes reference offloaded bodies but no blob store is configured.")
+            else:
+                bodies = await asyncio.to_thread(self.blob_store.get_texts, keys)
+        for node_dict in node_dicts:
+            for field in blob_fields:
+                key = node_dict.get(f"{field}_blob")
+                if key and key in bodies:
+                    node_dict[field] = bodies[key]
+                    node_dict[f"{field}_blob"] = None
+                elif key:
+                    print(f"Warning: Blob {key} for {field} of node {node_dict.get('node_id')} is missing.")
+
+    def render_tree_read_model(
+        self, node_entries: List[str], relationship_entries: List[str]
+    ) -> bytes:
+        """
+        Assembles stored read model entries into a GraphData JSON document.
+        Entries are already in API form, so they are spliced in verbatim.
+        """
+        return (
+            '{"nodes":[%s],"relationships":[%s]}'
+            % (",".join(node_entries), ",".join(relationship_entries))
+        ).encode("utf-8")
+
+    def _build_nodes(self, raw_nodes) -> List[models.InteractionNode]:
+        """
+        Normalizes projected node maps and builds the models. Offloaded bodies
+        stay as preview plus hash; see _build_hydrated_nodes.
+        """
+        return [
+            models.InteractionNode(**_normalize_node_dict(dict(raw_node)))
+            for raw_node in raw_nodes
+        ]
+
+    async def _build_hydrated_nodes(self, raw_nodes) -> List[models.InteractionNode]:
+        """Like _build_nodes, with offloaded bodies fetched from the blob store."""
+        node_dicts = [dict(raw_node) for raw_node in raw_nodes]
+        await self._hydrate_bodies(node_dicts)
+        return [
+            models.InteractionNode(**_normalize_node_dict(node_dict))
+            for node_dict in node_dicts
+        ]
 
     async def create_root_interaction_node(
         self,
@@ -18,9 +145,11 @@ class GraphDBService:
         user_prompt: str,
         summary_title: Optional[str],
         llm_response: str,  # LLM response is passed in
+        llm_usage: Optional[Dict[str, Any]] = None,
     ) -> models.InteractionNode:
         """
         Creates a new root InteractionNode in the database.
+        llm_usage holds token/latency properties (see prompts.usage_from_completion).
         """
         node_id = str(uuid.uuid4())
         current_timestamp = datetime.utcnow()
@@ -30,48 +159,53 @@ class GraphDBService:
             node_id: $node_id,
             user_prompt: $user_prompt,
             llm_response: $llm_response,
+            llm_response_blob: $llm_response_blob,
             timestamp: $timestamp,
             summary_title: $summary_title,
             is_starting_node: true,
-            user_id: $user_id_param
+            user_id: $user_id_param,
+            root_id: $node_id,
+            depth: 0,
+            ancestor_ids: [],
+            revision: 1,
+            tree_revision: 1
         })
-        RETURN i.node_id AS node_id, i.user_prompt AS user_prompt, i.llm_response AS llm_response,
-               i.timestamp AS timestamp, i.summary_title AS summary_title,
-               i.is_starting_node AS is_starting_node, i.user_id AS user_id
-        """
+        SET i += $llm_usage
+        RETURN %s AS node
+        """ % node_projection("i")
         params = {
             "node_id": node_id,
             "user_prompt": user_prompt,
-            "llm_response": llm_response,
+            **self._offload_body("llm_response", llm_response),
             "timestamp": current_timestamp,
             "summary_title": summary_title,
             "user_id_param": user_id,
+            "llm_usage": llm_usage or {},
         }
-        try:
-            results = self.db_conn.query(query, params)
+
+        def create_root(tx):
+            results = list(tx.run(query, params))
             if not results or not results[0]:
                 # This should ideally not happen if CREATE is successful
                 raise Exception(
                     "Failed to create interaction node in database (no results)."
                 )  # More specific exception?
 
-            created_node_data = dict(results[0])
-
-            # Ensure timestamp is Python datetime for Pydantic model
-            if "timestamp" in created_node_data and not isinstance(
-                created_node_data["timestamp"], datetime
-            ):
-                if hasattr(created_node_data["timestamp"], "to_native"):
-                    created_node_data["timestamp"] = created_node_data[
-                        "timestamp"
-                    ].to_native()
-                else:
-                    # Log this or handle as an error more strictly
-                    print(
-                        f"Warning: Root node timestamp type unknown or not auto-converted for node {created_node_data.get('node_id')}"
-                    )
+            created_node = self._build_nodes([results[0]["node"]])[0]
+            if self.read_model_enabled:
+                read_model.init_tree(
+                    tx,
+                    created_node.node_id,
+                    created_node.user_id,
+                    created_node.model_dump_json(),
+                )
+            # The caller gets the full body it just generated, with no fetch.
+            return created_node.model_copy(
+                update={"llm_response": llm_response, "llm_response_blob": None}
+            )
 
-            return models.InteractionNode(**created_node_data)
+        try:
+            return self.db_conn.write_transaction(create_root)
         except Exception as e:
             # Log the exception (e.g., using a proper logger)
             print(
@@ -87,6 +221,7 @@ class GraphDBService:
         summary_title: Optional[str],
         llm_response: str,  # LLM response is passed in
         context_messages: Optional[List[models.Message]],
+        llm_usage: Optional[Dict[str, Any]] = None,
     ) -> models.InteractionNode:
         """
         Creates a new branched InteractionNode and links it to a parent.
@@ -95,7 +230,8 @@ class GraphDBService:
         # 1. Verify parent node exists and belongs to the current user
         parent_check_query = """
         MATCH (p:InteractionNode {node_id: $parent_node_id, user_id: $user_id})
-        RETURN p.node_id AS id
+        RETURN p.node_id AS id, p.is_starting_node AS is_starting_node,
+               p.root_id AS root_id, p.depth AS depth, p.ancestor_ids AS ancestor_ids
         """
         parent_check_params = {"parent_node_id": parent_node_id, "user_id": user_id}
 
@@ -106,6 +242,25 @@ class GraphDBService:
                 f"Parent node {parent_node_id} not found or not accessible by user {user_id}."
             )
 
+        # The child inherits the parent's tree membership so that whole-tree and
+        # ancestor lookups never need a variable-length traversal.
+        parent_data = dict(parent_results[0])
+        root_id = parent_data.get("root_id")
+        if root_id is None and parent_data.get("is_starting_node"):
+            root_id = parent_node_id
+        if root_id is None:
+            # Parent predates the materialized tree fields (see migrations.py).
+            print(
+                f"Warning: Parent node {parent_node_id} has no root_id; run the tree backfill migration."
+            )
+            depth = None
+            ancestor_ids = None
+        else:
+            depth = (parent_data.get("depth") or 0) + 1
+            ancestor_ids = list(parent_data.get("ancestor_ids") or []) + [
+                parent_node_id
+            ]
+
         # 2. Create the new branched node
         new_node_id = str(uuid.uuid4())
         current_timestamp = datetime.utcnow()
@@ -121,118 +276,117 @@ class GraphDBService:
             node_id: $node_id,
             user_prompt: $user_prompt,
             llm_response: $llm_response,
+            llm_response_blob: $llm_response_blob,
             timestamp: $timestamp,
             summary_title: $summary_title,
             is_starting_node: false,
             user_id: $user_id_param,
-            context_messages: $context_messages
+            context_messages: $context_messages,
+            context_messages_blob: $context_messages_blob,
+            root_id: $root_id,
+            depth: $depth,
+            ancestor_ids: $ancestor_ids,
+            revision: 1
         })
-        RETURN b.node_id AS node_id, b.user_prompt AS user_prompt, b.llm_response AS llm_response,
-               b.timestamp AS timestamp, b.summary_title AS summary_title,
-               b.is_starting_node AS is_starting_node, b.user_id AS user_id,
-               b.context_messages as context_messages
-        """
+        SET b += $llm_usage
+        RETURN %s AS node
+        """ % node_projection("b")
         branch_node_params = {
             "node_id": new_node_id,
             "user_prompt": user_prompt,
-            "llm_response": llm_response,
+            **self._offload_body("llm_response", llm_response),
             "timestamp": current_timestamp,
             "summary_title": summary_title,
             "user_id_param": user_id,
-            "context_messages": db_context_messages_json,
+            **self._offload_body("context_messages", db_context_messages_json),
+            "root_id": root_id,
+            "depth": depth,
+            "ancestor_ids": ancestor_ids,
+            "llm_usage": llm_usage or {},
         }
 
-        branch_node_results = self.db_conn.query(
-            create_branch_query, branch_node_params
-        )
-        if not branch_node_results or not branch_node_results[0]:
-            raise Exception("Failed to create branched interaction node in database.")
-
-        newly_created_node_data = dict(branch_node_results[0])
-
-        if newly_created_node_data.get("context_messages") and isinstance(
-            newly_created_node_data["context_messages"], str
-        ):
-            newly_created_node_data["context_messages"] = json.loads(
-                newly_created_node_data["context_messages"]
-            )
-
         # 3. Create the :BRANCHED_TO relationship
         link_query = """
         MATCH (p:InteractionNode {node_id: $parent_node_id})
         MATCH (b:InteractionNode {node_id: $branch_node_id})
         CREATE (p)-[r:BRANCHED_TO {timestamp: $timestamp, created_by: 'user'}]->(b)
-        RETURN type(r) AS relationship_type
+        WITH r
+        OPTIONAL MATCH (root:InteractionNode {node_id: $root_id})
+        SET root.tree_revision = coalesce(root.tree_revision, 0) + 1
+        RETURN type(r) AS relationship_type, properties(r) AS properties
         """
         link_params = {
             "parent_node_id": parent_node_id,
             "branch_node_id": new_node_id,
             "timestamp": current_timestamp,
+            "root_id": root_id,
         }
-        link_results = self.db_conn.query(link_query, link_params)
-        if not link_results or not link_results[0].get("relationship_type"):
-            # This is more critical. If the node is created but not linked, it's an issue.
-            # Consider cleanup logic or a more specific error.
-            # For now, we'll let the node be returned but log a strong warning.
-            print(
-                f"CRITICAL WARNING: Branched node {new_node_id} created but FAILED to link to parent {parent_node_id}."
-            )
-            # raise Exception(f"Failed to link branch node {new_node_id} to parent {parent_node_id}.")
-
-        if "timestamp" in newly_created_node_data and not isinstance(
-            newly_created_node_data["timestamp"], datetime
-        ):
-            if hasattr(newly_created_node_data["timestamp"], "to_native"):
-                newly_created_node_data["timestamp"] = newly_created_node_data[
-                    "timestamp"
-                ].to_native()
-            else:
-                print(
-                    f"Warning: Branched node timestamp type unknown or not auto-converted for node {newly_created_node_data.get('node_id')}"
+
+        # Node, edge and read model are written in one transaction, so a branch
+        # can no longer be left created but unlinked.
+        def create_and_link(tx):
+            branch_node_results = list(tx.run(create_branch_query, branch_node_params))
+            if not branch_node_results or not branch_node_results[0]:
+                raise Exception(
+                    "Failed to create branched interaction node in database."
+                )
+
+            link_results = list(tx.run(link_query, link_params))
+            if not link_results or not link_results[0].get("relationship_type"):
+                raise Exception(
+                    f"Failed to link branch node {new_node_id} to parent {parent_node_id}."
+                )
+
+            branched_node = self._build_nodes([branch_node_results[0]["node"]])[0]
+            if self.read_model_enabled and root_id is not None:
+                rel_properties = dict(link_results[0]["properties"])
+                if hasattr(rel_properties.get("timestamp"), "to_native"):
+                    rel_properties["timestamp"] = rel_properties["timestamp"].to_native()
+                relationship = models.RelationshipData(
+                    source=parent_node_id,
+                    target=new_node_id,
+                    type=link_results[0]["relationship_type"],
+                    properties=rel_properties,
+                )
+                read_model.append_branch(
+                    tx,
+                    root_id,
+                    branched_node.model_dump_json(),
+                    relationship.model_dump_json(),
                 )
+            return branched_node.model_copy(
+                update={
+                    "llm_response": llm_response,
+                    "llm_response_blob": None,
+                    "context_messages": context_messages or None,
+                    "context_messages_blob": None,
+                }
+            )
 
-        return models.InteractionNode(**newly_created_node_data)
+        return self.db_conn.write_transaction(create_and_link)
 
     async def get_interaction_node_by_id(
-        self, node_id: str, user_id: str
+        self, node_id: str, user_id: str, hydrate: bool = True
     ) -> Optional[models.InteractionNode]:
         """
         Retrieves a specific InteractionNode by its ID, ensuring it belongs to the user.
-        Returns None if not found or not owned by user.
+        Returns None if not found or not owned by user. With hydrate=False,
+        offloaded bodies are left as preview plus hash.
         """
         query = """
         MATCH (i:InteractionNode {node_id: $node_id, user_id: $user_id_param})
-        RETURN
-            i.node_id AS node_id, i.user_prompt AS user_prompt, i.llm_response AS llm_response,
-            i.timestamp AS timestamp, i.summary_title AS summary_title,
-            i.is_starting_node AS is_starting_node, i.user_id AS user_id,
-            i.context_messages AS context_messages
+        RETURN %s AS node
         LIMIT 1
-        """
+        """ % node_projection("i")
         params = {"node_id": node_id, "user_id_param": user_id}
 
         results = self.db_conn.query(query, params)
         if not results or not results[0]:
             return None
 
-        node_data = dict(results[0])
-
-        if node_data.get("context_messages") and isinstance(
-            node_data["context_messages"], str
-        ):
-            node_data["context_messages"] = json.loads(node_data["context_messages"])
-
-        if "timestamp" in node_data and not isinstance(
-            node_data["timestamp"], datetime
-        ):
-            if hasattr(node_data["timestamp"], "to_native"):
-                node_data["timestamp"] = node_data["timestamp"].to_native()
-            else:
-                print(
-                    f"Warning: Node timestamp type unknown or not auto-converted for node {node_data.get('node_id')}"
-                )
-
-        return models.InteractionNode(**node_data)
+        if not hydrate:
+            return self._build_nodes([results[0]["node"]])[0]
+        return (await self._build_hydrated_nodes([results[0]["node"]]))[0]
 
     async def get_interaction_graph(
         self, start_node_id: str, user_id: str
@@ -241,11 +395,38 @@ class GraphDBService:
         Retrieves the full interaction graph (nodes and relationships) starting from
         a given node_id, ensuring all parts belong to the specified user_id.
         Returns None if the start_node_id is not found or not owned by the user.
+        Offloaded bodies are returned as preview plus hash, not fetched.
         """
         # Cypher query to fetch the subgraph
-        # 1. Validate start_node and get all distinct nodes in its component for the user
-        # 2. Get all relationships BETWEEN those nodes
+        # 1. Seek every node of the start node's tree through the root_id index and
+        #    keep the start node plus the nodes that list it among their ancestors
+        # 2. Each of those (except the start node) contributes its incoming edge
+        # 3. Flag any edge from those nodes to a child without root_id: the tree
+        #    is only partly backfilled and the index seek would truncate it
         query = """
+            MATCH (startNode:InteractionNode {node_id: $start_node_id, user_id: $user_id})
+            WHERE startNode.root_id IS NOT NULL
+            MATCH (n:InteractionNode {root_id: startNode.root_id})
+            WHERE n.user_id = startNode.user_id
+              AND (n = startNode OR startNode.node_id IN n.ancestor_ids)
+            OPTIONAL MATCH (:InteractionNode)-[rel:BRANCHED_TO]->(n)
+            WHERE n <> startNode
+            WITH collect(DISTINCT n) AS graphNodes, collect(DISTINCT rel) AS graphRelationships
+            RETURN
+                [node IN graphNodes | %s] AS nodes,
+                [r IN graphRelationships | {
+                    source: startNode(r).node_id,
+                    target: endNode(r).node_id,
+                    type: type(r),
+                    properties: properties(r)
+                }] AS relationships,
+                any(node IN graphNodes WHERE size(
+                    [(node)-[:BRANCHED_TO]->(c:InteractionNode) WHERE c.root_id IS NULL | c]
+                ) > 0) AS has_unstamped_nodes
+            """ % node_projection("node")
+        # Variable-length traversal for trees written before root_id existed, or
+        # only partly stamped by an interrupted backfill (see migrations.py).
+        legacy_query = """
             MATCH (startNode:InteractionNode {node_id: $start_node_id, user_id: $user_id})
             CALL {
                 WITH startNode
@@ -264,71 +445,52 @@ class GraphDBService:
 
             WITH graphNodes, collect(DISTINCT rel) AS graphRelationships
             RETURN
-                [node IN graphNodes | {
-                    node_id: node.node_id,
-                    user_prompt: node.user_prompt,
-                    llm_response: node.llm_response,
-                    timestamp: node.timestamp,
-                    summary_title: node.summary_title,
-                    is_starting_node: node.is_starting_node,
-                    user_id: node.user_id,
-                    context_messages: node.context_messages
-                }] AS nodes,
+                [node IN graphNodes | %s] AS nodes,
                 [r IN graphRelationships | {
                     source: startNode(r).node_id,
                     target: endNode(r).node_id,
                     type: type(r),
                     properties: properties(r)
                 }] AS relationships
-            """
+            """ % node_projection("node")
         params = {"start_node_id": start_node_id, "user_id": user_id}
 
         try:
             results = self.db_conn.query(query, params)
+            if results and results[0] and results[0]["has_unstamped_nodes"]:
+                print(
+                    f"Warning: Tree of node {start_node_id} is only partly backfilled; using the traversal query."
+                )
+                results = self.db_conn.query(legacy_query, params)
             if (
-                not results or not results[0] or results[0]["nodes"] is None
-            ):  # Check if startNode itself was found
-                # If the initial MATCH for startNode fails, results will be empty.
-                # If it succeeds but there are no paths, nodes list might be just [startNode] and relationships empty.
-                # If results[0]["nodes"] is None, it might mean the first MATCH failed.
-                # More robust check: verify startNode existence separately or rely on empty nodes list
-                # for startNode not found cases for the user.
-                # For now, if the main query returns no rows (startNode not found/owned), this check handles it.
-
+                not results or not results[0] or not results[0]["nodes"]
+            ):  # Start node not found, not owned, or not yet backfilled
                 # Check if startNode exists and is owned by user, to differentiate 404 vs empty graph
                 start_node_check = await self.get_interaction_node_by_id(
-                    start_node_id, user_id
+                    start_node_id, user_id, hydrate=False
                 )
                 if not start_node_check:
                     return None  # Start node itself not found or not owned
 
-                # If start node exists, but graph is empty (e.g. isolated node), return it
-                return models.GraphData(nodes=[start_node_check], relationships=[])
+                if start_node_check.root_id is None:
+                    results = self.db_conn.query(legacy_query, params)
+
+                if not results or not results[0] or not results[0]["nodes"]:
+                    # If start node exists, but graph is empty (e.g. isolated node), return it
+                    return models.GraphData(
+                        nodes=[start_node_check], relationships=[]
+                    )
 
             raw_graph_data = results[
                 0
             ]  # Expecting one row with 'nodes' and 'relationships'
 
-            # Process nodes: convert timestamps
-            processed_nodes = []
-            for node_dict in raw_graph_data.get("nodes", []):
-                if node_dict.get("context_messages") and isinstance(
-                    node_dict["context_messages"], str
-                ):
-                    node_dict["context_messages"] = json.loads(
-                        node_dict["context_messages"]
-                    )
-                if "timestamp" in node_dict and not isinstance(
-                    node_dict["timestamp"], datetime
-                ):
-                    if hasattr(node_dict["timestamp"], "to_native"):
-                        node_dict["timestamp"] = node_dict["timestamp"].to_native()
-                    # else: log warning or error
-                processed_nodes.append(models.InteractionNode(**node_dict))
+            processed_nodes = self._build_nodes(raw_graph_data.get("nodes", []))
 
             # Process relationships: convert timestamp in properties
             processed_relationships = []
             for rel_dict in raw_graph_data.get("relationships", []):
+                rel_dict = dict(rel_dict)
                 if "properties" in rel_dict and isinstance(
                     rel_dict["properties"], dict
                 ):
@@ -350,3 +512,453 @@ class GraphDBService:
                 f"GraphDBService Error: Failed to retrieve graph for start_node {start_node_id}, user {user_id}: {e}"
             )
             raise  # Re-raise to be handled by API layer
+
+    async def get_interaction_node_ancestors(
+        self, node_id: str, user_id: str, hydrate: bool = False
+    ) -> Optional[List[models.InteractionNode]]:
+        """
+        Retrieves the ancestor chain of a node, ordered from the root down to its
+        direct parent, using the node's materialized ancestor_ids.
+        Returns None if the node is not found or not owned by the user.
+        Pass hydrate=True to fetch offloaded bodies, e.g. to build a prompt.
+        """
+        query = """
+        MATCH (i:InteractionNode {node_id: $node_id, user_id: $user_id})
+        OPTIONAL MATCH (a:InteractionNode)
+        WHERE a.node_id IN i.ancestor_ids AND a.user_id = i.user_id
+        RETURN
+            i.ancestor_ids AS ancestor_ids,
+            collect(%s) AS ancestors
+        """ % node_projection("a")
+        params = {"node_id": node_id, "user_id": user_id}
+
+        try:
+            results = self.db_conn.query(query, params)
+            if not results or not results[0]:
+                return None
+
+            ancestor_ids = results[0]["ancestor_ids"] or []
+            if hydrate:
+                ancestors = await self._build_hydrated_nodes(results[0]["ancestors"])
+            else:
+                ancestors = self._build_nodes(results[0]["ancestors"])
+            ancestors_by_id = {node.node_id: node for node in ancestors}
+
+            return [
+                ancestors_by_id[ancestor_id]
+                for ancestor_id in ancestor_ids
+                if ancestor_id in ancestors_by_id
+            ]
+        except Exception as e:
+            print(
+                f"GraphDBService Error: Failed to retrieve ancestors for node {node_id}, user {user_id}: {e}"
+            )
+            raise
+
+    async def get_node_revision(self, node_id: str, user_id: str) -> Optional[int]:
+        """
+        Returns the revision of a node owned by the user without loading its body.
+        Returns None if the node is not found, not owned, or predates revisions.
+        """
+        query = """
+        MATCH (i:InteractionNode {node_id: $node_id, user_id: $user_id})
+        RETURN i.revision AS revision
+        LIMIT 1
+        """
+        results = self.db_conn.query(query, {"node_id": node_id, "user_id": user_id})
+        if not results or not results[0]:
+            return None
+        return results[0]["revision"]
+
+    async def get_tree_revision(
+        self, start_node_id: str, user_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the root_id and tree_revision of the tree containing start_node_id.
+        The tree revision is bumped on the root whenever any node in the tree
+        changes, so it is enough to validate a cached graph response.
+        Returns None if the node is not found, not owned, or not yet backfilled.
+        """
+        query = """
+        MATCH (s:InteractionNode {node_id: $start_node_id, user_id: $user_id})
+        MATCH (r:InteractionNode {node_id: s.root_id})
+        RETURN r.node_id AS root_id, r.tree_revision AS tree_revision
+        LIMIT 1
+        """
+        results = self.db_conn.query(
+            query, {"start_node_id": start_node_id, "user_id": user_id}
+        )
+        if not results or not results[0] or results[0]["tree_revision"] is None:
+            return None
+        return dict(results[0])
+
+    async def update_interaction_node(
+        self,
+        node_id: str,
+        user_id: str,
+        updates: models.InteractionNodeUpdate,
+    ) -> Optional[models.InteractionNode]:
+        """
+        Applies the fields set on `updates` to a node if its revision still equals
+        updates.expected_revision, then bumps the node and tree revisions.
+        Returns None if the node is not found or not owned by the user, and
+        raises RevisionConflictError if it was modified concurrently.
+        """
+        props = updates.model_dump(
+            exclude_unset=True, exclude={"expected_revision", "context_messages"}
+        )
+        # user_prompt and llm_response are required on a node, so null means "unchanged".
+        for required_field in ("user_prompt", "llm_response"):
+            if props.get(required_field) is None:
+                props.pop(required_field, None)
+        if "context_messages" in updates.model_fields_set:
+            props.update(
+                self._offload_body(
+                    "context_messages",
+                    json.dumps([msg.model_dump() for msg in updates.context_messages])
+                    if updates.context_messages
+                    else None,
+                )
+            )
+        if "llm_response" in props:
+            props.update(self._offload_body("llm_response", props["llm_response"]))
+
+        query = """
+        MATCH (i:InteractionNode {node_id: $node_id, user_id: $user_id})
+        WHERE coalesce(i.revision, 1) = $expected_revision
+        SET i += $props, i.revision = coalesce(i.revision, 1) + 1
+        WITH i
+        OPTIONAL MATCH (root:InteractionNode {node_id: i.root_id})
+        SET root.tree_revision = coalesce(root.tree_revision, 0) + 1
+        RETURN %s AS node
+        """ % node_projection("i")
+        params = {
+            "node_id": node_id,
+            "user_id": user_id,
+            "expected_revision": updates.expected_revision,
+            "props": props,
+        }
+
+        results = self.db_conn.query(query, params)
+        if not results or not results[0]:
+            existing_node = await self.get_interaction_node_by_id(
+                node_id, user_id, hydrate=False
+            )
+            if existing_node is None:
+                return None
+            raise RevisionConflictError(
+                f"Node {node_id} is at revision {existing_node.revision or 1}, "
+                f"not {updates.expected_revision}."
+            )
+
+        return self._build_nodes([results[0]["node"]])[0]
+
+    async def prune_subtree(
+        self,
+        node_id: str,
+        user_id: str,
+        batch_size: int = PRUNE_BATCH_SIZE,
+        max_batches: Optional[int] = None,
+    ) -> Optional[models.SubtreeOperationResult]:
+        """
+        Deletes a node and all of its descendants, deepest nodes first, in
+        transactions of at most `batch_size` nodes. The remaining part of the
+        subtree stays connected after every batch, so an interrupted prune (or
+        one stopped by `max_batches`) is resumed by calling this again.
+        Returns None if the node is not found or not owned by the user.
+        """
+        start_query = """
+        MATCH (s:InteractionNode {node_id: $node_id, user_id: $user_id})
+        RETURN s.root_id AS root_id
+        """
+        start_results = self.db_conn.query(
+            start_query, {"node_id": node_id, "user_id": user_id}
+        )
+        if not start_results or not start_results[0]:
+            return None
+        root_id = start_results[0]["root_id"]
+        if root_id is None:
+            raise Exception(
+                f"Node {node_id} has no root_id; run the tree backfill migration before pruning."
+            )
+
+        descendants_query = """
+        MATCH (n:InteractionNode {root_id: $root_id, user_id: $user_id})
+        WHERE $node_id IN n.ancestor_ids
+        WITH n ORDER BY n.depth DESC LIMIT $batch_size
+        DETACH DELETE n
+        WITH count(*) AS deleted
+        OPTIONAL MATCH (root:InteractionNode {node_id: $root_id})
+        WHERE deleted > 0
+        SET root.tree_revision = coalesce(root.tree_revision, 0) + 1
+        RETURN deleted
+        """
+        # Every batch bumps tree_revision in its own transaction, so cached
+        # reads are invalidated even when max_batches stops the prune early.
+        start_delete_query = """
+        MATCH (s:InteractionNode {node_id: $node_id, user_id: $user_id})
+        DETACH DELETE s
+        WITH count(*) AS deleted
+        OPTIONAL MATCH (root:InteractionNode {node_id: $root_id})
+        WHERE deleted > 0
+        SET root.tree_revision = coalesce(root.tree_revision, 0) + 1
+        RETURN deleted
+        """
+        params = {
+            "node_id": node_id,
+            "user_id": user_id,
+            "root_id": root_id,
+            "batch_size": batch_size,
+        }
+
+        processed = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                results = self.db_conn.query(descendants_query, params)
+                deleted = results[0]["deleted"] if results else 0
+                if not deleted:
+                    break
+                batches += 1
+                processed += deleted
+                print(
+                    f"Pruning subtree {node_id}: batch {batches} deleted {deleted} nodes ({processed} so far)."
+                )
+            else:
+                # Stopped by max_batches with descendants possibly remaining.
+                return models.SubtreeOperationResult(
+                    operation="prune",
+                    node_id=node_id,
+                    processed=processed,
+                    completed=False,
+                )
+
+            results = self.db_conn.query(start_delete_query, params)
+            processed += results[0]["deleted"] if results else 0
+            if root_id == node_id:
+                # The whole tree is gone, so is its read model.
+                read_model.delete_document(self.db_conn, root_id)
+            return models.SubtreeOperationResult(
+                operation="prune", node_id=node_id, processed=processed, completed=True
+            )
+        except Exception as e:
+            print(
+                f"GraphDBService Error: Failed to prune subtree {node_id} after {processed} nodes: {e}"
+            )
+            raise
+
+    async def copy_subtree(
+        self,
+        node_id: str,
+        user_id: str,
+        new_parent_id: str,
+        copy_id: Optional[str] = None,
+    ) -> Optional[models.SubtreeOperationResult]:
+        """
+        Copies a node and all of its descendants under new_parent_id with a single
+        UNWIND write. New node IDs are derived from copy_id, so repeating a copy
+        with the same copy_id converges on the same nodes instead of duplicating.
+        Returns None if the source node is not found or not owned by the user, and
+        raises ValueError if the new parent is not.
+        """
+        copy_id = copy_id or str(uuid.uuid4())
+
+        parent_query = """
+        MATCH (p:InteractionNode {node_id: $new_parent_id, user_id: $user_id})
+        RETURN p.root_id AS root_id, p.depth AS depth, p.ancestor_ids AS ancestor_ids
+        """
+        parent_results = self.db_conn.query(
+            parent_query, {"new_parent_id": new_parent_id, "user_id": user_id}
+        )
+        if not parent_results or not parent_results[0]:
+            raise ValueError(
+                f"Parent node {new_parent_id} not found or not accessible by user {user_id}."
+            )
+        parent_data = dict(parent_results[0])
+        if parent_data["root_id"] is None:
+            raise Exception(
+                f"Node {new_parent_id} has no root_id; run the tree backfill migration before copying."
+            )
+
+        subtree_query = """
+        MATCH (s:InteractionNode {node_id: $node_id, user_id: $user_id})
+        WHERE s.root_id IS NOT NULL
+        MATCH (n:InteractionNode {root_id: s.root_id, user_id: $user_id})
+        WHERE n = s OR s.node_id IN n.ancestor_ids
+        RETURN n.node_id AS node_id, n.user_prompt AS user_prompt,
+               n.llm_response AS llm_response, n.summary_title AS summary_title,
+               n.context_messages AS context_messages, n.depth AS depth,
+               n.llm_response_blob AS llm_response_blob,
+               n.context_messages_blob AS context_messages_blob,
+               n.ancestor_ids AS ancestor_ids
+        ORDER BY n.depth
+        """
+        source_nodes = [
+            dict(record)
+            for record in self.db_conn.query(
+                subtree_query, {"node_id": node_id, "user_id": user_id}
+            )
+        ]
+        if not source_nodes:
+            return None
+
+        namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"subtree-copy:{copy_id}")
+        new_ids = {
+            n["node_id"]: str(uuid.uuid5(namespace, n["node_id"])) for n in source_nodes
+        }
+        source_depth = source_nodes[0]["depth"]
+        base_ancestors = list(parent_data["ancestor_ids"] or []) + [new_parent_id]
+
+        rows = []
+        for n in source_nodes:
+            # Ancestors below the copied root, remapped to their copies.
+            relative_ancestors = (n["ancestor_ids"] or [])[source_depth:]
+            ancestor_ids = base_ancestors + [new_ids[a] for a in relative_ancestors]
+            rows.append(
+                {
+                    "node_id": new_ids[n["node_id"]],
+                    "parent_id": ancestor_ids[-1],
+                    "props": {
+                        "user_prompt": n["user_prompt"],
+                        # Blobs are content-addressed, so copies share them.
+                        "llm_response": n["llm_response"],
+                        "llm_response_blob": n["llm_response_blob"],
+                        "summary_title": n["summary_title"],
+                        "context_messages": n["context_messages"],
+                        "context_messages_blob": n["context_messages_blob"],
+                        "is_starting_node": False,
+                        "user_id": user_id,
+                        "root_id": parent_data["root_id"],
+                        "depth": len(ancestor_ids),
+                        "ancestor_ids": ancestor_ids,
+                        "revision": 1,
+                    },
+                }
+            )
+
+        # Rows are ordered by depth, so every parent is merged before its children.
+        copy_query = """
+        UNWIND $rows AS row
+        MERGE (n:InteractionNode {node_id: row.node_id})
+        ON CREATE SET n += row.props, n.timestamp = $timestamp
+        WITH n, row
+        MATCH (p:InteractionNode {node_id: row.parent_id})
+        MERGE (p)-[r:BRANCHED_TO]->(n)
+        ON CREATE SET r.timestamp = $timestamp, r.created_by = 'copy'
+        WITH count(n) AS copied
+        OPTIONAL MATCH (root:InteractionNode {node_id: $root_id})
+        SET root.tree_revision = coalesce(root.tree_revision, 0) + 1
+        RETURN copied
+        """
+        params = {
+            "rows": rows,
+            "timestamp": datetime.utcnow(),
+            "root_id": parent_data["root_id"],
+        }
+        try:
+            results = self.db_conn.query(copy_query, params)
+            copied = results[0]["copied"] if results else 0
+            print(
+                f"Copied subtree {node_id} ({copied} nodes) under {new_parent_id} as {new_ids[node_id]}."
+            )
+            return models.SubtreeOperationResult(
+                operation="copy",
+                node_id=node_id,
+                processed=copied,
+                completed=True,
+                new_node_id=new_ids[node_id],
+                copy_id=copy_id,
+            )
+        except Exception as e:
+            print(
+                f"GraphDBService Error: Failed to copy subtree {node_id} under {new_parent_id}: {e}"
+            )
+            raise
+
+    async def get_prompt_cache_report(
+        self, node_id: str, user_id: str
+    ) -> Optional[models.PromptCacheReport]:
+        """
+        Aggregates prompt-cache hits and LLM latency by depth for the tree that
+        contains node_id. Returns None if the node is not found, not owned by the
+        user, or not yet backfilled.
+        """
+        query = """
+        MATCH (s:InteractionNode {node_id: $node_id, user_id: $user_id})
+        WHERE s.root_id IS NOT NULL
+        MATCH (n:InteractionNode {root_id: s.root_id})
+        WHERE n.user_id = s.user_id AND n.prompt_tokens IS NOT NULL
+        RETURN
+            n.depth AS depth,
+            count(n) AS node_count,
+            sum(n.prompt_tokens) AS prompt_tokens,
+            sum(coalesce(n.cached_tokens, 0)) AS cached_tokens,
+            avg(n.llm_latency_ms) AS avg_latency_ms
+        ORDER BY depth
+        """
+        root_query = """
+        MATCH (s:InteractionNode {node_id: $node_id, user_id: $user_id})
+        RETURN s.root_id AS root_id
+        """
+        params = {"node_id": node_id, "user_id": user_id}
+
+        root_results = self.db_conn.query(root_query, params)
+        if not root_results or not root_results[0] or not root_results[0]["root_id"]:
+            return None
+
+        depths = []
+        for record in self.db_conn.query(query, params):
+            row = dict(record)
+            prompt_tokens = row["prompt_tokens"] or 0
+            cached_tokens = row["cached_tokens"] or 0
+            depths.append(
+                models.PromptCacheDepthStats(
+                    depth=row["depth"] or 0,
+                    node_count=row["node_count"],
+                    prompt_tokens=prompt_tokens,
+                    cached_tokens=cached_tokens,
+                    cache_hit_ratio=(
+                        cached_tokens / prompt_tokens if prompt_tokens else 0.0
+                    ),
+                    avg_latency_ms=row["avg_latency_ms"],
+                )
+            )
+        return models.PromptCacheReport(
+            root_id=root_results[0]["root_id"], depths=depths
+        )
+
+    async def get_tree_read_model(self, root_id: str, user_id: str) -> Optional[bytes]:
+        """
+        Returns the GraphData JSON of the tree rooted at root_id, rendered from
+        its read model, if the read model is enabled and current, otherwise None.
+        """
+        if not self.read_model_enabled:
+            return None
+        document = read_model.read_document(self.db_conn, root_id, user_id)
+        if document is None:
+            return None
+        _, node_entries, relationship_entries = document
+        return self.render_tree_read_model(node_entries, relationship_entries)
+
+    async def store_tree_read_model(
+        self, root_id: str, user_id: str, revision: int, graph: models.GraphData
+    ) -> bool:
+        """
+        Stores a freshly built read model for `revision`, unless the tree has
+        changed since. Returns True if it was stored.
+        """
+        if not self.read_model_enabled:
+            return False
+        try:
+            return read_model.store_document(
+                self.db_conn,
+                root_id,
+                user_id,
+                revision,
+                [node.model_dump_json() for node in graph.nodes],
+                [rel.model_dump_json() for rel in graph.relationships],
+            )
+        except Exception as e:
+            # The read model is an optimization; failing to refresh it must not fail the read.
+            print(f"Warning: Failed to store read model for tree {root_id}: {e}")
+            return False
@@ -0,0 +1,83 @@
+# backend/gunicorn_conf.py
+# Gunicorn settings for the long-running container (see Dockerfile.server).
+# Each worker process imports main.py itself (no preload), so it owns exactly
+# one Neo4j driver pool and one AsyncOpenAI client shared by all its requests.
+import math
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def available_cpus() -> int:
+    """
+    CPUs this container may actually use. os.cpu_count() reports the host's
+    cores; the affinity mask and the cgroup CPU quota are what the scheduler
+    enforces.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS.
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:  # cgroup v2
+            quota, period = f.read().split()
+    except OSError:
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:  # cgroup v1
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return cpus
+    if quota not in ("max", "-1"):
+        cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    return cpus
+
+
+# Live tree updates reach WebSocket subscribers on other workers only through a
+# shared broker (see tree_events.py). Without TREE_EVENTS_REDIS_URL they fan out
+# in-process, so while they are enabled the server runs a single worker; set
+# TREE_EVENTS_REDIS_URL, or TREE_EVENTS_ENABLED=false, to scale out.
+TREE_EVENTS_ENABLED = os.environ.get("TREE_EVENTS_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+TREE_EVENTS_IN_PROCESS = TREE_EVENTS_ENABLED and not os.environ.get(
+    "TREE_EVENTS_REDIS_URL"
+)
+
+# Requests spend most of their time waiting on Neo4j and OpenAI, so one async
+# worker per usable CPU is enough to saturate the machine. Each worker holds its
+# own Neo4j pool, so the count is capped by MAX_WORKERS; WEB_CONCURRENCY overrides.
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "8"))
+if TREE_EVENTS_IN_PROCESS:
+    default_workers = 1
+else:
+    default_workers = min(available_cpus(), MAX_WORKERS)
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
+if workers > 1 and TREE_EVENTS_IN_PROCESS:
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} requires TREE_EVENTS_REDIS_URL or "
+        "TREE_EVENTS_ENABLED=false: live tree updates are delivered in-process "
+        "and would miss other workers' writes."
+    )
+
+# Keep connections from the load balancer open across requests.
+keepalive = int(os.environ.get("KEEPALIVE_SECONDS", "75"))
+
+# LLM calls can take a while; give in-flight requests time to finish on
+# SIGTERM before workers are killed (keep below the orchestrator's grace period).
+# Workers spend the first DRAIN_DELAY_SECONDS of it failing /readyz while still
+# serving (see main.install_drain_handler).
+timeout = int(os.environ.get("WORKER_TIMEOUT_SECONDS", "120"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", "30"))
+
+# Recycle workers occasionally to bound memory growth; jitter avoids restarting
+# them all at once.
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = "-"
+errorlog = "-"
@@ -0,0 +1,41 @@
+# backend/http_cache.py
+import hashlib
+from typing import Optional
+
+# Suffixes appended to an ETag by CompressionMiddleware so that each encoding of
+# a representation keeps its own strong validator.
+ENCODING_ETAG_SUFFIXES = ("-gzip", "-br")
+
+
+def make_etag(*parts) -> str:
+    """Builds a strong, quoted ETag from the revision-identifying parts."""
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _normalize_etag(etag: str) -> str:
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            etag = etag[: -len(suffix) - 1] + '"'
+            break
+    return etag
+
+
+def if_none_match_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    True if the If-None-Match header value matches `etag`, meaning the client's
+    cached copy is current and a 304 can be returned.
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _normalize_etag(etag)
+    return any(
+        _normalize_etag(candidate) == target
+        for candidate in if_none_match.split(",")
+        if candidate.strip()
+    )
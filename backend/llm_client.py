@@ -0,0 +1,411 @@
+# backend/llm_client.py
+import asyncio
+import math
+import os
+import random
+import time
+from collections import Counter, deque
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+DEFAULT_MODEL = "gpt-4o-2024-08-06"
+
+# The whole call has to fit in the Lambda timeout (30s, see
+# terraform/environments/dev/application.tf), and API Gateway gives up at about
+# 29s, with Neo4j work before and after the call. Keep LLM_DEADLINE_SECONDS
+# below that budget if either changes.
+DEFAULT_DEADLINE_SECONDS = 25.0
+DEFAULT_ATTEMPT_TIMEOUT_SECONDS = 12.0
+DEFAULT_FALLBACK_RESERVE_SECONDS = 6.0
+
+# Errors worth retrying: the request may well succeed on another attempt.
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no completion could be obtained within the retry/deadline policy."""
+
+
+# Receives each streamed text delta and the attempt number it belongs to. A retry
+# restarts the response, so consumers should discard deltas from earlier attempts.
+DeltaCallback = Callable[[str, int], Awaitable[None]]
+
+
+class LLMMetrics:
+    """In-process outcome counters for LLM calls, keyed by outcome and model."""
+
+    def __init__(self):
+        self._counts = Counter()
+
+    def incr(self, outcome: str, model: Optional[str] = None):
+        self._counts[outcome if model is None else f"{outcome}:{model}"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+
+class LatencyWindow:
+    """
+    The most recent successful attempt latencies per model, from which the
+    hedge delay is derived. Percentiles are None until `min_samples` are in.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.size = size
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float):
+        self._samples.setdefault(model, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, model: str, percent: float) -> Optional[float]:
+        samples = self._samples.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Frees the half-open trial slot of a call that ended without an outcome."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if (
+            self._opened_at is not None
+            or self._consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+
+
+class ResilientLLMClient:
+    """
+    Wraps AsyncOpenAI chat completions with a per-call deadline, jittered
+    retries on retryable errors, optional request hedging, a circuit breaker
+    and an optional cheaper fallback model. With a fallback configured, the
+    last `fallback_reserve_seconds` of the deadline are kept for it.
+
+    Hedging is enabled by `hedge_delay_seconds`. Once enough calls to a model
+    have succeeded, the hedge goes out at that model's recent p95 latency;
+    hedge_delay_seconds is the floor, and the delay until then.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str = DEFAULT_MODEL,
+        fallback_model: Optional[str] = None,
+        deadline_seconds: float = DEFAULT_DEADLINE_SECONDS,
+        attempt_timeout_seconds: float = DEFAULT_ATTEMPT_TIMEOUT_SECONDS,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.5,
+        hedge_delay_seconds: Optional[float] = None,
+        fallback_reserve_seconds: float = DEFAULT_FALLBACK_RESERVE_SECONDS,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[LLMMetrics] = None,
+        latencies: Optional[LatencyWindow] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.fallback_model = fallback_model
+        self.deadline_seconds = deadline_seconds
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.fallback_reserve_seconds = fallback_reserve_seconds
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.metrics = metrics or LLMMetrics()
+        self.latencies = latencies or LatencyWindow()
+
+    @classmethod
+    def from_env(cls, client: AsyncOpenAI) -> "ResilientLLMClient":
+        """Builds a client from LLM_* environment variables."""
+        hedge_delay = os.environ.get("LLM_HEDGE_DELAY_SECONDS")
+        return cls(
+            client=client,
+            model=os.environ.get("LLM_MODEL", DEFAULT_MODEL),
+            fallback_model=os.environ.get("LLM_FALLBACK_MODEL") or None,
+            deadline_seconds=float(
+                os.environ.get("LLM_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS)
+            ),
+            attempt_timeout_seconds=float(
+                os.environ.get(
+                    "LLM_ATTEMPT_TIMEOUT_SECONDS", DEFAULT_ATTEMPT_TIMEOUT_SECONDS
+                )
+            ),
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+            hedge_delay_seconds=float(hedge_delay) if hedge_delay else None,
+            fallback_reserve_seconds=float(
+                os.environ.get(
+                    "LLM_FALLBACK_RESERVE_SECONDS", DEFAULT_FALLBACK_RESERVE_SECONDS
+                )
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=int(
+                    os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")
+                ),
+                reset_timeout=float(
+                    os.environ.get("LLM_CIRCUIT_RESET_SECONDS", "30")
+                ),
+            ),
+            latencies=LatencyWindow(
+                size=int(os.environ.get("LLM_HEDGE_WINDOW", "200")),
+                min_samples=int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20")),
+            ),
+        )
+
+    async def create_chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        on_delta: Optional[DeltaCallback] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Returns a chat completion for `messages` from the primary model, or from
+        the fallback model if the primary's circuit is open or it keeps failing.
+        If `on_delta` is given the response is streamed through it as it arrives
+        (hedging is skipped, since two streams would interleave).
+        Raises LLMUnavailableError if neither produces a completion in time.
+        """
+        started = time.monotonic()
+        primary_timeout = self.deadline_seconds
+        if self.fallback_model:
+            primary_timeout = max(
+                self.deadline_seconds - self.fallback_reserve_seconds, 0.0
+            )
+        is_trial = self.circuit_breaker.state == "half_open"
+        if self.circuit_breaker.allow_request():
+            try:
+                completion = await asyncio.wait_for(
+                    self._call_with_retries(self.model, messages, on_delta, **kwargs),
+                    timeout=primary_timeout,
+                )
+                self.circuit_breaker.record_success()
+                self.metrics.incr("success", self.model)
+                return completion
+            except asyncio.TimeoutError:
+                self.circuit_breaker.record_failure()
+                self.metrics.incr("timeout", self.model)
+                print(
+                    f"LLM Error: {self.model} timed out within its {primary_timeout}s share of the deadline."
+                )
+            except RETRYABLE_ERRORS as e:
+                self.circuit_breaker.record_failure()
+                self.metrics.incr("failure", self.model)
+                print(f"LLM Error: {self.model} failed after retries: {e}")
+            except Exception:
+                # The upstream answered; the request itself was rejected (e.g. 400),
+                # which says nothing about availability and isn't worth a fallback.
+                self.circuit_breaker.record_success()
+                self.metrics.incr("rejected", self.model)
+                raise
+            finally:
+                if is_trial:
+                    # A cancelled trial records no outcome; without this the
+                    # circuit would stay half-open and never admit another.
+                    self.circuit_breaker.release_trial()
+        else:
+            self.metrics.incr("circuit_open", self.model)
+            print(f"LLM Warning: circuit open for {self.model}, failing fast.")
+
+        if not self.fallback_model:
+            raise LLMUnavailableError(f"LLM model {self.model} is unavailable.")
+
+        # The fallback gets whatever remains of the deadline (at least the
+        # reserve when the primary used its full share), never more.
+        remaining = self.deadline_seconds - (time.monotonic() - started)
+        if remaining <= 0:
+            raise LLMUnavailableError(
+                f"LLM model {self.model} is unavailable and the deadline has passed."
+            )
+        self.metrics.incr("fallback", self.fallback_model)
+        try:
+            completion = await asyncio.wait_for(
+                self._call_with_retries(
+                    self.fallback_model, messages, on_delta, **kwargs
+                ),
+                timeout=remaining,
+            )
+        except Exception as e:
+            self.metrics.incr("failure", self.fallback_model)
+            raise LLMUnavailableError(
+                f"LLM models {self.model} and {self.fallback_model} are unavailable: {e}"
+            ) from e
+        self.metrics.incr("success", self.fallback_model)
+        return completion
+
+    async def _call_with_retries(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        on_delta: Optional[DeltaCallback],
+        **kwargs,
+    ) -> Any:
+        attempt = 0
+        while True:
+            try:
+                if on_delta is not None:
+                    return await self._streaming_attempt(
+                        model, messages, on_delta, attempt, **kwargs
+                    )
+                if self.hedge_delay_seconds is None:
+                    return await self._attempt(model, messages, **kwargs)
+                return await self._hedged_attempt(model, messages, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                # Full jitter: sleep a random amount up to the exponential cap.
+                delay = random.uniform(
+                    0, self.backoff_base_seconds * (2 ** (attempt - 1))
+                )
+                self.metrics.incr("retry", model)
+                print(
+                    f"LLM Warning: retrying {model} (attempt {attempt}) in {delay:.2f}s after: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        started = time.monotonic()
+        completion = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=model, messages=messages, **kwargs
+            ),
+            timeout=self.attempt_timeout_seconds,
+        )
+        self.latencies.record(model, time.monotonic() - started)
+        return completion
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait before hedging: the model's recent p95, at least the floor."""
+        p95 = self.latencies.percentile(model, 95)
+        if p95 is None:
+            return self.hedge_delay_seconds
+        return max(p95, self.hedge_delay_seconds)
+
+    async def _streaming_attempt(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        on_delta: DeltaCallback,
+        attempt: int,
+        **kwargs,
+    ):
+        """
+        Streams one attempt through on_delta and returns an object shaped like a
+        ChatCompletion (choices[0].message.content, usage, model).
+        """
+
+        async def consume():
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs,
+            )
+            parts = []
+            usage = None
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    delta = chunk.choices[0].delta.content
+                    parts.append(delta)
+                    await on_delta(delta, attempt)
+            return SimpleNamespace(
+                model=model,
+                usage=usage,
+                choices=[
+                    SimpleNamespace(
+                        message=SimpleNamespace(role="assistant", content="".join(parts))
+                    )
+                ],
+            )
+
+        return await asyncio.wait_for(consume(), timeout=self.attempt_timeout_seconds)
+
+    async def _hedged_attempt(
+        self, model: str, messages: List[Dict[str, Any]], **kwargs
+    ):
+        """
+        Starts one request and, if it hasn't answered after hedge_delay(model),
+        a second identical one. The first successful response wins and the
+        other is cancelled.
+        """
+        primary = asyncio.ensure_future(self._attempt(model, messages, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(
+                pending, timeout=self.hedge_delay(model)
+            )
+            if not done:
+                self.metrics.incr("hedge_sent", model)
+                hedge = asyncio.ensure_future(self._attempt(model, messages, **kwargs))
+                pending.add(hedge)
+
+            last_error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.metrics.incr("hedge_won", model)
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    raise last_error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
@@ -3,21 +3,76 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Depends, status, Header
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Depends,
+    status,
+    Header,
+    Response,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from contextlib import asynccontextmanager
 from typing import List, Optional
 import os  # Import os to access environment variables
-from openai import OpenAI  # Import the OpenAI client
+import asyncio
+import signal
+import time
+import openai
+from openai import AsyncOpenAI  # Import the OpenAI client
 
 # Import from your local modules
 from db import get_db_connection, close_db_connection, Neo4jConnection
 import models  # Your Pydantic models from models.py
-from graph_service import GraphDBService  # Import the new service
+from graph_service import GraphDBService, RevisionConflictError
+from compression import CompressionMiddleware
+from http_cache import make_etag, if_none_match_matches
+from llm_client import ResilientLLMClient, LLMUnavailableError
+from tree_events import TreeEventHub, create_broker_from_env, TREE_EVENTS_ENABLED
+import prompts
+from blob_store import create_blob_store_from_env
+from read_model import READ_MODEL_ENABLED
 
 import uuid
 from datetime import datetime
 
 
+# Seconds between SIGTERM and the server closing its listener. /readyz reports
+# draining for this long first, so load balancers stop routing here before
+# connections are refused. Keep it well below gunicorn's graceful_timeout.
+DRAIN_DELAY_SECONDS = float(os.environ.get("DRAIN_DELAY_SECONDS", "5"))
+
+
+def install_drain_handler(loop: asyncio.AbstractEventLoop):
+    """
+    Chains onto the server's SIGTERM handler: readiness fails as soon as the
+    signal arrives, and the server's own graceful shutdown starts
+    DRAIN_DELAY_SECONDS later. Returns a function that restores the previous
+    handler. Does nothing off the main thread (e.g. under TestClient) or when no
+    server owns the signal.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+    except ValueError:
+        return lambda: None
+    if not callable(previous):
+        return lambda: None
+
+    def on_sigterm(signum, frame):
+        app.state.draining = True
+        loop.call_soon_threadsafe(
+            loop.call_later, DRAIN_DELAY_SECONDS, previous, signum, frame
+        )
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        return lambda: None
+    return lambda: signal.signal(signal.SIGTERM, previous)
+
+
 # --- Lifespan Manager ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -35,13 +90,27 @@ async def lifespan(app: FastAPI):
             )
     except Exception as e:
         print(f"Application startup: Failed to initialize database due to: {e}")
+    app.state.draining = False
+    restore_sigterm = install_drain_handler(asyncio.get_running_loop())
     yield
+    restore_sigterm()
+    print("Application shutdown: Closing OpenAI client...")
+    await openai_client.close()
     print("Application shutdown: Closing database connection...")
     close_db_connection()
     print("Database connection closed.")
 
 
 app = FastAPI(lifespan=lifespan)
+app.state.draining = False
+
+# Seconds the readiness probe waits for the Neo4j pool before reporting failure.
+READINESS_TIMEOUT_SECONDS = float(os.environ.get("READINESS_TIMEOUT_SECONDS", "2"))
+
+# Responses smaller than this are sent uncompressed; llm_response text compresses
+# well, but tiny payloads are not worth the CPU or the extra headers.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
 
 # Initialize OpenAI client globally or within a dependency
 # It's good practice to get the API key from environment variables
@@ -52,7 +121,29 @@ app = FastAPI(lifespan=lifespan)
 #     )
 # In a production environment, you might want to raise an error here
 # raise Exception("OPENAI_API_KEY environment variable not set.")
-openai_client = OpenAI()
+# Retries are handled by ResilientLLMClient, so the SDK's own are disabled.
+openai_client = AsyncOpenAI(max_retries=0)
+llm_client = ResilientLLMClient.from_env(openai_client)
+
+# Large response/context bodies go to the blob store when one is configured
+# (BLOB_STORE_BACKEND=fs|s3); otherwise they stay inline on the nodes.
+blob_store = create_blob_store_from_env()
+
+# Fan-out of live tree updates to /ws/trees/{root_id} subscribers in this process.
+# Without TREE_EVENTS_REDIS_URL the broker does not cross processes, so
+# gunicorn_conf.py then refuses to start more than one worker unless
+# TREE_EVENTS_ENABLED is turned off.
+tree_hub = TreeEventHub(broker=create_broker_from_env())
+
+
+async def publish_tree_event(root_id: Optional[str], event_type: str, data: dict):
+    """Best-effort publish; a push failure must never fail the write that caused it."""
+    if root_id is None:
+        return
+    try:
+        await tree_hub.publish(root_id, event_type, data)
+    except Exception as e:
+        print(f"Warning: Failed to publish {event_type} event for tree {root_id}: {e}")
 
 
 # --- Database Dependency ---
@@ -86,7 +177,11 @@ def get_graph_service(
     db_conn: Neo4jConnection = Depends(get_db_conn),
 ) -> GraphDBService:
     """Dependency to provide an instance of GraphDBService."""
-    return GraphDBService(db_connection=db_conn)
+    return GraphDBService(
+        db_connection=db_conn,
+        blob_store=blob_store,
+        read_model_enabled=READ_MODEL_ENABLED,
+    )
 
 
 @app.get("/")
@@ -115,6 +210,41 @@ async def test_db_connection(
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 
+@app.get("/healthz")
+async def liveness_probe():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness_probe(response: Response):
+    """
+    Ready only if this process is not draining and its shared Neo4j driver can
+    reach the database.
+    """
+    if app.state.draining:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "draining"}
+    try:
+        conn = get_db_connection()
+        await asyncio.wait_for(
+            asyncio.to_thread(conn.verify_connectivity),
+            timeout=READINESS_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        print(f"Readiness check failed: {e}")
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "unavailable", "detail": str(e)}
+    return {"status": "ready"}
+
+
+@app.get("/llm_metrics")
+async def get_llm_metrics():
+    return {
+        "circuit_state": llm_client.circuit_breaker.state,
+        "outcomes": llm_client.metrics.snapshot(),
+    }
+
+
 @app.post(
     "/interaction-nodes/start",
     response_model=models.InteractionNode,
@@ -130,17 +260,16 @@ async def create_root_interaction_node_endpoint(
     try:
         print(f"Calling OpenAI API for prompt: '{payload.user_prompt}'")
         # Make the OpenAI API call
-        chat_completion = openai_client.chat.completions.create(
-            model="gpt-4o-2024-08-06",  # Or your preferred OpenAI model, e.g., "gpt-4o"
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are skilled teacher. Don't jump into directly answering the questino. Identify how a user wants to learn about a topic. Ask many questions to gather more context and fully understand how a student wants to learn.",
-                },
-                {"role": "user", "content": payload.user_prompt},
-            ],
+        llm_started = time.perf_counter()
+        chat_completion = await llm_client.create_chat_completion(
+            messages=prompts.build_root_messages(payload.user_prompt),
         )
         llm_response_text = chat_completion.choices[0].message.content
+        llm_usage = prompts.usage_from_completion(
+            chat_completion,
+            latency_ms=(time.perf_counter() - llm_started) * 1000,
+            version=prompts.ROOT_PROMPT_VERSION,
+        )
         print("Successfully received response from OpenAI.")
 
         created_node = await graph_svc.create_root_interaction_node(
@@ -148,8 +277,24 @@ async def create_root_interaction_node_endpoint(
             user_prompt=payload.user_prompt,
             summary_title=payload.summary_title,
             llm_response=llm_response_text,
+            llm_usage=llm_usage,
+        )
+        await publish_tree_event(
+            created_node.root_id, "node.created", created_node.model_dump(mode="json")
         )
         return created_node
+    except LLMUnavailableError as le:
+        print(f"API Error: LLM unavailable for root interaction node: {le}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The language model is temporarily unavailable. Please try again shortly.",
+        )
+    except openai.BadRequestError as bre:
+        print(f"API Error: LLM rejected root prompt: {bre}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The language model rejected the request: {bre.message}",
+        )
     except Exception as e:
         print(f"API Error: Failed to create root interaction node: {e}")
         raise HTTPException(
@@ -172,28 +317,69 @@ async def create_branched_interaction_node_endpoint(
     # sagemaker_svc: SageMakerService = Depends(get_sagemaker_service), # Removed SageMaker dependency
 ):
     try:
-        messages_for_llm = [
-            {
-                "role": "system",
-                "content": "You are a skilled teacher. Follow the agreed learning path and method specifics by which the user wishes to learn (details, high-level overview, examples, analogies etc.). Ask questions at the end to learn more about the user and to identify which direction they which to go down.",
-            }
-        ]
+        # Resolve the parent up front so that ownership is checked before paying
+        # for a completion, and so tokens can be streamed to the parent's tree.
+        parent_node = await graph_svc.get_interaction_node_by_id(
+            node_id=parent_node_id, user_id=current_user_id
+        )
+        if parent_node is None:
+            raise ValueError(
+                f"Parent node {parent_node_id} not found or not accessible by user {current_user_id}."
+            )
+        tree_root_id = parent_node.root_id
+
+        # Rebuilding history from the stored ancestor chain gives every branch of
+        # a tree the same byte-identical prefix, which the provider can cache.
+        ancestor_chain = None
+        if tree_root_id is not None:
+            ancestors = await graph_svc.get_interaction_node_ancestors(
+                node_id=parent_node_id, user_id=current_user_id, hydrate=True
+            )
+            ancestor_chain = (ancestors or []) + [parent_node]
+        messages_for_llm = prompts.build_branch_messages(
+            user_prompt=payload.user_prompt,
+            ancestor_chain=ancestor_chain,
+            context_messages=payload.context_messages,
+        )
+        stream_id = str(uuid.uuid4())
 
-        if payload.context_messages:
-            messages_for_llm.extend(
-                [msg.model_dump() for msg in payload.context_messages]
+        async def publish_token(delta: str, attempt: int):
+            await publish_tree_event(
+                tree_root_id,
+                "token",
+                {
+                    "stream_id": stream_id,
+                    "parent_node_id": parent_node_id,
+                    "attempt": attempt,
+                    "delta": delta,
+                },
             )
 
-        messages_for_llm.append({"role": "user", "content": payload.user_prompt})
+        # Streaming rules out hedging, so only stream when someone is watching.
+        stream_tokens = False
+        if tree_root_id is not None:
+            try:
+                stream_tokens = await tree_hub.has_subscribers(tree_root_id)
+            except Exception as e:
+                print(f"Warning: Could not check for tree subscribers: {e}")
 
         print(f"Calling OpenAI API for branch prompt: '{payload.user_prompt}'")
         # Make the OpenAI API call
-        chat_completion = openai_client.chat.completions.create(
-            model="gpt-4o-2024-08-06",  # Or your preferred OpenAI model
+        llm_started = time.perf_counter()
+        chat_completion = await llm_client.create_chat_completion(
             messages=messages_for_llm,
+            on_delta=publish_token if stream_tokens else None,
         )
         llm_response_text = chat_completion.choices[0].message.content
-        print("Successfully received response from OpenAI.")
+        llm_usage = prompts.usage_from_completion(
+            chat_completion,
+            latency_ms=(time.perf_counter() - llm_started) * 1000,
+            version=prompts.BRANCH_PROMPT_VERSION,
+        )
+        print(
+            f"Successfully received response from OpenAI "
+            f"({llm_usage['cached_tokens']}/{llm_usage['prompt_tokens']} prompt tokens cached)."
+        )
 
         branched_node = await graph_svc.create_branched_interaction_node(
             parent_node_id=parent_node_id,
@@ -201,7 +387,26 @@ async def create_branched_interaction_node_endpoint(
             user_prompt=payload.user_prompt,
             summary_title=payload.summary_title,
             llm_response=llm_response_text,
-            context_messages=payload.context_messages,
+            # Client context is only sent for trees without an ancestor chain;
+            # otherwise the prompt is rebuilt from the stored nodes, so keep none.
+            context_messages=(
+                payload.context_messages if ancestor_chain is None else None
+            ),
+            llm_usage=llm_usage,
+        )
+        await publish_tree_event(
+            tree_root_id,
+            "node.created",
+            dict(branched_node.model_dump(mode="json"), stream_id=stream_id),
+        )
+        await publish_tree_event(
+            tree_root_id,
+            "edge.created",
+            {
+                "source": parent_node_id,
+                "target": branched_node.node_id,
+                "type": "BRANCHED_TO",
+            },
         )
         return branched_node
     except ValueError as ve:
@@ -210,6 +415,19 @@ async def create_branched_interaction_node_endpoint(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(ve),
         )
+    except LLMUnavailableError as le:
+        print(f"API Error: LLM unavailable for branch: {le}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The language model is temporarily unavailable. Please try again shortly.",
+        )
+    except openai.BadRequestError as bre:
+        # e.g. context_length_exceeded: a client-side problem, not a server error.
+        print(f"API Error: LLM rejected branch prompt: {bre}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The language model rejected the request: {bre.message}",
+        )
     except Exception as e:
         print(f"API Error: Failed to create branched interaction node: {e}")
         raise HTTPException(
@@ -227,10 +445,25 @@ async def create_branched_interaction_node_endpoint(
 )
 async def get_interaction_node_by_id_endpoint(
     node_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user_id: str = Depends(get_current_user_id_from_header),
     graph_svc: GraphDBService = Depends(get_graph_service),
 ):
     try:
+        # Revalidate against the node's revision before loading the full node.
+        if if_none_match:
+            revision = await graph_svc.get_node_revision(
+                node_id=node_id, user_id=current_user_id
+            )
+            if revision is not None:
+                etag = make_etag("node", node_id, revision)
+                if if_none_match_matches(if_none_match, etag):
+                    return Response(
+                        status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": etag},
+                    )
+
         node = await graph_svc.get_interaction_node_by_id(
             node_id=node_id, user_id=current_user_id
         )
@@ -239,6 +472,8 @@ async def get_interaction_node_by_id_endpoint(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
             )
+        if node.revision is not None:
+            response.headers["ETag"] = make_etag("node", node_id, node.revision)
         return node
     except HTTPException:
         raise
@@ -258,6 +493,8 @@ async def get_interaction_node_by_id_endpoint(
 )
 async def get_interaction_graph_endpoint(
     start_node_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user_id: str = Depends(get_current_user_id_from_header),
     graph_svc: GraphDBService = Depends(get_graph_service),
 ):
@@ -265,8 +502,43 @@ async def get_interaction_graph_endpoint(
     Retrieves the entire explorable graph (nodes and relationships) starting
     from the given start_node_id, ensuring all elements belong to the
     authenticated user.
+    The ETag is derived from the tree revision, so an If-None-Match hit is
+    answered with a 304 after a single indexed lookup. With the read model
+    enabled, whole-tree reads are served from its pre-serialized entries.
     """
     try:
+        tree_revision = await graph_svc.get_tree_revision(
+            start_node_id=start_node_id, user_id=current_user_id
+        )
+        etag = None
+        if tree_revision is not None:
+            etag = make_etag(
+                "graph",
+                start_node_id,
+                tree_revision["root_id"],
+                tree_revision["tree_revision"],
+            )
+            if if_none_match_matches(if_none_match, etag):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag},
+                )
+
+        is_whole_tree = (
+            tree_revision is not None and tree_revision["root_id"] == start_node_id
+        )
+        if is_whole_tree:
+            document = await graph_svc.get_tree_read_model(
+                root_id=start_node_id, user_id=current_user_id
+            )
+            if document is not None:
+                # Already serialized; CompressionMiddleware encodes it as usual.
+                return Response(
+                    content=document,
+                    media_type="application/json",
+                    headers={"ETag": etag},
+                )
+
         graph_data = await graph_svc.get_interaction_graph(
             start_node_id=start_node_id, user_id=current_user_id
         )
@@ -275,6 +547,16 @@ async def get_interaction_graph_endpoint(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Start node with ID '{start_node_id}' not found or not owned by user.",
             )
+        if is_whole_tree:
+            # Missing or stale read model: store the document just built.
+            await graph_svc.store_tree_read_model(
+                root_id=start_node_id,
+                user_id=current_user_id,
+                revision=tree_revision["tree_revision"],
+                graph=graph_data,
+            )
+        if etag is not None:
+            response.headers["ETag"] = etag
         return graph_data
     except HTTPException:
         raise
@@ -288,7 +570,263 @@ async def get_interaction_graph_endpoint(
         )
 
 
+@app.get(
+    "/interaction-nodes/{node_id}/ancestors",
+    response_model=List[models.InteractionNode],
+    status_code=status.HTTP_200_OK,
+    tags=["Interaction Nodes"],
+)
+async def get_interaction_node_ancestors_endpoint(
+    node_id: str,
+    current_user_id: str = Depends(get_current_user_id_from_header),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Returns the path from the root of the node's tree down to its direct parent.
+    Root nodes have no ancestors and return an empty list.
+    """
+    try:
+        ancestors = await graph_svc.get_interaction_node_ancestors(
+            node_id=node_id, user_id=current_user_id
+        )
+        if ancestors is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
+            )
+        return ancestors
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"API Error: Failed to get ancestors for node {node_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while retrieving ancestors of InteractionNode '{node_id}'.",
+        )
+
+
+@app.get(
+    "/interaction-nodes/{node_id}/prompt-cache-report",
+    response_model=models.PromptCacheReport,
+    status_code=status.HTTP_200_OK,
+    tags=["Interaction Nodes"],
+)
+async def get_prompt_cache_report_endpoint(
+    node_id: str,
+    current_user_id: str = Depends(get_current_user_id_from_header),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Reports the prompt-cache hit ratio and LLM latency per depth for the tree
+    containing the given node.
+    """
+    try:
+        report = await graph_svc.get_prompt_cache_report(
+            node_id=node_id, user_id=current_user_id
+        )
+        if report is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
+            )
+        return report
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"API Error: Failed to build prompt cache report for {node_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while building the prompt cache report: {str(e)}",
+        )
+
+
+@app.patch(
+    "/interaction-nodes/{node_id}",
+    response_model=models.InteractionNode,
+    status_code=status.HTTP_200_OK,
+    tags=["Interaction Nodes"],
+)
+async def update_interaction_node_endpoint(
+    node_id: str,
+    payload: models.InteractionNodeUpdate,
+    response: Response,
+    current_user_id: str = Depends(get_current_user_id_from_header),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Updates a node's editable fields. The request must carry the revision the
+    client last read; if the node has changed since, a 409 is returned.
+    """
+    try:
+        node = await graph_svc.update_interaction_node(
+            node_id=node_id, user_id=current_user_id, updates=payload
+        )
+        if node is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
+            )
+        response.headers["ETag"] = make_etag("node", node_id, node.revision)
+        return node
+    except HTTPException:
+        raise
+    except RevisionConflictError as rce:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(rce))
+    except Exception as e:
+        print(f"API Error: Failed to update interaction node {node_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while updating InteractionNode '{node_id}'.",
+        )
+
+
+@app.delete(
+    "/interaction-nodes/{node_id}/subtree",
+    response_model=models.SubtreeOperationResult,
+    status_code=status.HTTP_200_OK,
+    tags=["Interaction Nodes"],
+)
+async def prune_subtree_endpoint(
+    node_id: str,
+    max_batches: Optional[int] = Query(
+        None,
+        ge=1,
+        description="Stop after this many delete batches; repeat the request to resume.",
+    ),
+    current_user_id: str = Depends(get_current_user_id_from_header),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Deletes a node and everything branched from it in bounded batches.
+    """
+    try:
+        result = await graph_svc.prune_subtree(
+            node_id=node_id, user_id=current_user_id, max_batches=max_batches
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
+            )
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"API Error: Failed to prune subtree {node_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while pruning the subtree of '{node_id}': {str(e)}",
+        )
+
+
+@app.post(
+    "/interaction-nodes/{node_id}/copy",
+    response_model=models.SubtreeOperationResult,
+    status_code=status.HTTP_201_CREATED,
+    tags=["Interaction Nodes"],
+)
+async def copy_subtree_endpoint(
+    node_id: str,
+    payload: models.SubtreeCopyRequest,
+    current_user_id: str = Depends(get_current_user_id_from_header),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Copies a node and everything branched from it under another node.
+    """
+    try:
+        result = await graph_svc.copy_subtree(
+            node_id=node_id,
+            user_id=current_user_id,
+            new_parent_id=payload.new_parent_id,
+            copy_id=payload.copy_id,
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"InteractionNode with ID '{node_id}' not found or not owned by user.",
+            )
+        return result
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        print(f"API Error: New parent issue for copy: {ve}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
+    except Exception as e:
+        print(f"API Error: Failed to copy subtree {node_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while copying the subtree of '{node_id}': {str(e)}",
+        )
+
+
+@app.websocket("/ws/trees/{root_id}")
+async def tree_events_websocket(
+    websocket: WebSocket,
+    root_id: str,
+    user_id: Optional[str] = Query(None),
+    x_user_id: Optional[str] = Header(None),
+    graph_svc: GraphDBService = Depends(get_graph_service),
+):
+    """
+    Pushes node.created, edge.created and token events for one tree. Browsers
+    can't set headers on WebSockets, so the user may also be given as ?user_id=.
+    Requires a long-running server; API Gateway/Mangum does not carry WebSockets.
+    """
+    if not TREE_EVENTS_ENABLED:
+        # Disabled on multi-worker servers without a shared broker, where this
+        # worker would miss writes handled by its siblings.
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason="Live tree updates are disabled on this server.",
+        )
+        return
+    current_user_id = x_user_id or user_id
+    if not current_user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    root_node = await graph_svc.get_interaction_node_by_id(
+        node_id=root_id, user_id=current_user_id, hydrate=False
+    )
+    if root_node is None or root_node.root_id != root_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with tree_hub.subscribe(root_id) as subscription:
+
+        async def send_events():
+            while True:
+                event = await subscription.get()
+                if event is None:
+                    # Fell too far behind; the client should reconnect and refetch.
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    return
+                await websocket.send_json(event)
+
+        async def watch_disconnect():
+            try:
+                while True:
+                    await websocket.receive_text()
+            except WebSocketDisconnect:
+                pass
+
+        tasks = [
+            asyncio.ensure_future(send_events()),
+            asyncio.ensure_future(watch_disconnect()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
 # --- Mangum Handler ---
 from mangum import Mangum
 
-handler = Mangum(app, lifespan="on")
+# Lifespan events are left to long-running servers. Mangum would run startup and
+# shutdown around every invocation, closing the OpenAI client and the Neo4j
+# driver that a warm Lambda instance should keep for the next one; both are
+# created lazily on first use instead.
+handler = Mangum(app, lifespan="off")
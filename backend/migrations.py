@@ -0,0 +1,163 @@
+# backend/migrations.py
+"""
+One-off schema and data migrations for the Neo4j graph.
+
+Run from the backend directory with the same environment as the API:
+    python migrations.py
+Every step is idempotent and only touches nodes that still need it, so the
+script can be interrupted and re-run safely.
+"""
+from db import get_db_connection, close_db_connection, Neo4jConnection
+from blob_store import BlobStore, create_blob_store_from_env, make_preview
+from read_model import ensure_read_model_indexes
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def ensure_tree_indexes(db_conn: Neo4jConnection):
+    """Creates the indexes used by root_id seeks and node_id lookups."""
+    db_conn.query(
+        "CREATE INDEX interaction_node_root_id IF NOT EXISTS "
+        "FOR (n:InteractionNode) ON (n.root_id)"
+    )
+    db_conn.query(
+        "CREATE INDEX interaction_node_node_id IF NOT EXISTS "
+        "FOR (n:InteractionNode) ON (n.node_id)"
+    )
+
+
+def backfill_tree_fields(
+    db_conn: Neo4jConnection, batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """
+    Populates root_id, depth and ancestor_ids on InteractionNodes created before
+    these fields existed. Roots are stamped first, then children are filled in
+    level by level from already-stamped parents, in batches of `batch_size`.
+    Returns the number of nodes updated.
+    """
+    roots_query = """
+    MATCH (r:InteractionNode)
+    WHERE r.root_id IS NULL AND NOT ()-[:BRANCHED_TO]->(r)
+    WITH r LIMIT $batch_size
+    SET r.root_id = r.node_id, r.depth = 0, r.ancestor_ids = []
+    RETURN count(r) AS updated
+    """
+    children_query = """
+    MATCH (p:InteractionNode)-[:BRANCHED_TO]->(c:InteractionNode)
+    WHERE c.root_id IS NULL AND p.root_id IS NOT NULL
+    WITH p, c LIMIT $batch_size
+    SET c.root_id = p.root_id,
+        c.depth = p.depth + 1,
+        c.ancestor_ids = p.ancestor_ids + p.node_id
+    RETURN count(c) AS updated
+    """
+    params = {"batch_size": batch_size}
+    total_updated = 0
+
+    # Children only become eligible once their parent is stamped, so keep going
+    # until a pass finds nothing left to update.
+    for query in (roots_query, children_query):
+        while True:
+            results = db_conn.query(query, params)
+            updated = results[0]["updated"] if results else 0
+            if not updated:
+                break
+            total_updated += updated
+            print(f"Backfilled tree fields on {updated} nodes...")
+
+    return total_updated
+
+
+def backfill_revisions(
+    db_conn: Neo4jConnection, batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """
+    Sets revision = 1 on nodes without one and tree_revision = 1 on roots without
+    one, so existing nodes and trees get ETags. Returns the number of nodes updated.
+    """
+    query = """
+    MATCH (n:InteractionNode)
+    WHERE n.revision IS NULL OR (n.root_id = n.node_id AND n.tree_revision IS NULL)
+    WITH n LIMIT $batch_size
+    SET n.revision = coalesce(n.revision, 1),
+        n.tree_revision = CASE WHEN n.root_id = n.node_id
+                               THEN coalesce(n.tree_revision, 1)
+                               ELSE n.tree_revision END
+    RETURN count(n) AS updated
+    """
+    total_updated = 0
+    while True:
+        results = db_conn.query(query, {"batch_size": batch_size})
+        updated = results[0]["updated"] if results else 0
+        if not updated:
+            break
+        total_updated += updated
+        print(f"Backfilled revisions on {updated} nodes...")
+    return total_updated
+
+
+def offload_inline_bodies(
+    db_conn: Neo4jConnection,
+    blob_store: BlobStore,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+) -> int:
+    """
+    Moves llm_response and context_messages bodies that are still stored inline
+    and exceed the blob store's threshold into the blob store, leaving a preview
+    and the content hash on the node. Returns the number of nodes updated.
+    """
+    select_query = """
+    MATCH (n:InteractionNode)
+    WHERE (n.llm_response_blob IS NULL AND size(n.llm_response) >= $min_chars)
+       OR (n.context_messages_blob IS NULL AND size(n.context_messages) >= $min_chars)
+    RETURN n.node_id AS node_id, n.llm_response AS llm_response,
+           n.context_messages AS context_messages
+    LIMIT $batch_size
+    """
+    update_query = """
+    UNWIND $rows AS row
+    MATCH (n:InteractionNode {node_id: row.node_id})
+    SET n += row.props
+    RETURN count(n) AS updated
+    """
+    params = {"min_chars": blob_store.offload_min_chars, "batch_size": batch_size}
+    total_updated = 0
+    while True:
+        rows = []
+        for record in db_conn.query(select_query, params):
+            props = {}
+            if blob_store.should_offload(record["llm_response"]):
+                props["llm_response_blob"] = blob_store.put_text(record["llm_response"])
+                props["llm_response"] = make_preview(record["llm_response"])
+            if blob_store.should_offload(record["context_messages"]):
+                props["context_messages_blob"] = blob_store.put_text(
+                    record["context_messages"]
+                )
+                props["context_messages"] = None
+            rows.append({"node_id": record["node_id"], "props": props})
+        if not rows:
+            break
+        # Blobs are written before the nodes point at them, so an interrupted
+        # run leaves at worst unreferenced blobs and is safe to repeat.
+        results = db_conn.query(update_query, {"rows": rows})
+        updated = results[0]["updated"] if results else 0
+        total_updated += updated
+        print(f"Offloaded bodies of {updated} nodes to the blob store...")
+    return total_updated
+
+
+if __name__ == "__main__":
+    conn = get_db_connection()
+    try:
+        ensure_tree_indexes(conn)
+        ensure_read_model_indexes(conn)
+        count = backfill_tree_fields(conn)
+        print(f"Tree backfill complete: {count} nodes updated.")
+        count = backfill_revisions(conn)
+        print(f"Revision backfill complete: {count} nodes updated.")
+        blob_store = create_blob_store_from_env()
+        if blob_store is not None:
+            count = offload_inline_bodies(conn, blob_store)
+            print(f"Blob offload complete: {count} nodes updated.")
+    finally:
+        close_db_connection()
@@ -72,7 +72,47 @@ class InteractionNode(InteractionNodeBase):
         description="The ID of the user who initiated this interaction."
     )
     context_messages: Optional[List[Message]] = Field(
-        None, description="The history of messages leading up to this node's creation."
+        None,
+        description="Client-supplied history sent to the LLM for this node. Only set for trees without materialized ancestors; otherwise the prompt is rebuilt from the ancestor chain (see prompt_version).",
+    )
+    llm_response_blob: Optional[str] = Field(
+        None,
+        description="Set when llm_response is only a preview of a body kept in the blob store; GET /interaction-nodes/{node_id} returns the full body.",
+    )
+    context_messages_blob: Optional[str] = Field(
+        None,
+        description="Set when context_messages is kept in the blob store and left out here; GET /interaction-nodes/{node_id} returns it.",
+    )
+    root_id: Optional[str] = Field(
+        None, description="Node ID of the root of the tree this node belongs to."
+    )
+    depth: Optional[int] = Field(
+        None, ge=0, description="Distance from the root node (the root has depth 0)."
+    )
+    ancestor_ids: Optional[List[str]] = Field(
+        None,
+        description="Node IDs on the path from the root down to this node's parent, root first.",
+    )
+    revision: Optional[int] = Field(
+        None, ge=1, description="Incremented every time this node is modified."
+    )
+    prompt_version: Optional[str] = Field(
+        None, description="Version of the system prompt template used to generate the response."
+    )
+    llm_model: Optional[str] = Field(
+        None, description="The model that generated the response."
+    )
+    prompt_tokens: Optional[int] = Field(
+        None, description="Prompt tokens billed for generating the response."
+    )
+    completion_tokens: Optional[int] = Field(
+        None, description="Completion tokens billed for generating the response."
+    )
+    cached_tokens: Optional[int] = Field(
+        None, description="Prompt tokens served from the provider's prompt cache."
+    )
+    llm_latency_ms: Optional[float] = Field(
+        None, description="Wall-clock time of the LLM call in milliseconds."
     )
 
     model_config = {"from_attributes": True}
@@ -88,6 +128,56 @@ class InteractionNodeUpdate(BaseModel):
     context_messages: Optional[List[Message]] = Field(
         None, description="The history of messages leading up to this node's creation."
     )
+    expected_revision: int = Field(
+        ...,
+        ge=1,
+        description="The node revision the client last read; the update is rejected if the node has changed since.",
+    )
+
+
+class SubtreeCopyRequest(BaseModel):
+    new_parent_id: str = Field(
+        description="Node ID that the copied subtree will be attached under."
+    )
+    copy_id: Optional[str] = Field(
+        None,
+        description="Idempotency key. Retrying with the same copy_id never creates duplicate nodes.",
+    )
+
+
+class SubtreeOperationResult(BaseModel):
+    operation: str = Field(description="The operation performed ('prune' or 'copy').")
+    node_id: str = Field(description="Node ID of the subtree root the operation targeted.")
+    processed: int = Field(description="Number of nodes deleted or copied by this call.")
+    completed: bool = Field(
+        description="False if work remains; repeat the same request to resume."
+    )
+    new_node_id: Optional[str] = Field(
+        None, description="For copies, the node ID of the new subtree root."
+    )
+    copy_id: Optional[str] = Field(
+        None, description="For copies, the idempotency key used."
+    )
+
+
+class PromptCacheDepthStats(BaseModel):
+    depth: int = Field(description="Tree depth the statistics are aggregated over.")
+    node_count: int = Field(description="Nodes at this depth with recorded usage.")
+    prompt_tokens: int = Field(description="Total prompt tokens at this depth.")
+    cached_tokens: int = Field(description="Total prompt tokens served from cache.")
+    cache_hit_ratio: float = Field(
+        description="cached_tokens / prompt_tokens, or 0 if there were no prompt tokens."
+    )
+    avg_latency_ms: Optional[float] = Field(
+        None, description="Mean LLM latency at this depth."
+    )
+
+
+class PromptCacheReport(BaseModel):
+    root_id: str = Field(description="Root of the tree the report covers.")
+    depths: List[PromptCacheDepthStats] = Field(
+        description="Per-depth statistics, shallowest first."
+    )
 
 
 # --- NEW: Models for Graph Data ---
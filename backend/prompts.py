@@ -0,0 +1,120 @@
+# backend/prompts.py
+"""
+Prompt construction for the interaction endpoints.
+
+Providers cache prompts by exact prefix, so everything here is built to be
+byte-stable: system prompts are versioned constants, and a branch's messages
+are the parent's messages plus one new turn. Nothing volatile (timestamps,
+IDs, per-request wording) is ever placed ahead of the ancestor history.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import models
+
+ROOT_PROMPT_VERSION = "root-v1"
+BRANCH_PROMPT_VERSION = "branch-v1"
+
+# Upper bound on the characters of a prompt (about 4 per token), so that deep
+# branches stay inside the model's context window with room for the answer.
+PROMPT_CHAR_BUDGET = int(os.environ.get("PROMPT_CHAR_BUDGET", "300000"))
+
+# Never edit a published template in place: add a new version so existing
+# cached prefixes (and the prompt_version recorded on nodes) stay meaningful.
+SYSTEM_PROMPTS = {
+    "root-v1": "You are skilled teacher. Don't jump into directly answering the questino. Identify how a user wants to learn about a topic. Ask many questions to gather more context and fully understand how a student wants to learn.",
+    "branch-v1": "You are a skilled teacher. Follow the agreed learning path and method specifics by which the user wishes to learn (details, high-level overview, examples, analogies etc.). Ask questions at the end to learn more about the user and to identify which direction they which to go down.",
+}
+
+
+def _message(role: str, content: str) -> Dict[str, str]:
+    # Always the same two keys in the same order, so serialization is stable.
+    return {"role": role, "content": content}
+
+
+def build_root_messages(
+    user_prompt: str, version: str = ROOT_PROMPT_VERSION
+) -> List[Dict[str, str]]:
+    """Messages for a new root interaction."""
+    return [_message("system", SYSTEM_PROMPTS[version]), _message("user", user_prompt)]
+
+
+def _fit_turns(
+    turns: List[Tuple[str, str]], available: int, keep_first: bool
+) -> List[Tuple[str, str]]:
+    """
+    Drops turns until the rest fit in `available` characters: the most recent
+    ones are kept, plus the first if keep_first and it fits. The result depends
+    only on the turns, so siblings still share one prefix.
+    """
+    sizes = [len(user) + len(assistant) for user, assistant in turns]
+    if sum(sizes) <= available:
+        return turns
+    head = []
+    if keep_first and turns and sizes[0] <= available:
+        head, available = [turns[0]], available - sizes[0]
+        turns, sizes = turns[1:], sizes[1:]
+    tail = []
+    for turn, size in zip(reversed(turns), reversed(sizes)):
+        if size > available:
+            break
+        tail.insert(0, turn)
+        available -= size
+    return head + tail
+
+
+def build_branch_messages(
+    user_prompt: str,
+    ancestor_chain: Optional[List[models.InteractionNode]],
+    context_messages: Optional[List[models.Message]] = None,
+    version: str = BRANCH_PROMPT_VERSION,
+    char_budget: int = PROMPT_CHAR_BUDGET,
+) -> List[Dict[str, str]]:
+    """
+    Messages for a branch. When the parent's ancestor chain (root first, parent
+    last) is known, the history is rebuilt from the stored nodes, so siblings
+    and descendants share an identical prefix. Otherwise, e.g. for trees not yet
+    backfilled, the client-supplied context_messages are used as before.
+    History beyond char_budget is dropped, keeping the root turn (it sets up
+    the learning path) and the most recent turns.
+    """
+    system_prompt = SYSTEM_PROMPTS[version]
+    available = char_budget - len(system_prompt) - len(user_prompt)
+    messages = [_message("system", system_prompt)]
+    if ancestor_chain:
+        turns = [(node.user_prompt, node.llm_response) for node in ancestor_chain]
+        for user, assistant in _fit_turns(turns, available, keep_first=True):
+            messages.append(_message("user", user))
+            messages.append(_message("assistant", assistant))
+    elif context_messages:
+        kept = _fit_turns(
+            [(msg.role, msg.content) for msg in context_messages],
+            available,
+            keep_first=False,
+        )
+        messages.extend(_message(role, content) for role, content in kept)
+    messages.append(_message("user", user_prompt))
+    return messages
+
+
+def usage_from_completion(
+    chat_completion: Any, latency_ms: float, version: str
+) -> Dict[str, Any]:
+    """
+    Extracts token usage, including prompt tokens served from the provider's
+    cache, as flat node properties.
+    """
+    usage = getattr(chat_completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_version": version,
+        "llm_model": getattr(chat_completion, "model", None),
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "cached_tokens": (
+            (getattr(details, "cached_tokens", None) or 0)
+            if usage is not None
+            else None
+        ),
+        "llm_latency_ms": round(latency_ms, 1),
+    }
@@ -0,0 +1,270 @@
+# backend/read_model.py
+"""
+Optional materialized read model for whole-tree reads.
+
+For each root, a :TreeReadModel node records the tree_revision the model
+reflects, and one :TreeReadModelEntry per node and per edge holds that
+element's API JSON. Bodies kept in the blob store stay there: node entries
+carry the preview and the blob hash, exactly as graph reads return them, so
+serving a tree is one index seek over its entries and no blob fetches.
+
+Root and branch creation add their entries in the same transaction as the
+write, without touching the rest of the tree. Any other write bumps
+tree_revision without touching the entries, which makes the model stale.
+Stale or missing models are never served: the reader falls back to the
+traversal query and stores a fresh model.
+
+Check or repair drift from the backend directory with:
+    python read_model.py --check
+    python read_model.py --repair
+Only drift (a current model whose content differs from the graph) fails the
+check; trees that have never been read, or were changed since, are expected.
+"""
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+READ_MODEL_ENABLED = os.environ.get("READ_MODEL_ENABLED", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def init_tree(tx, root_id: str, user_id: str, node_entry: str):
+    """Creates the model for a brand-new root, inside the root's write transaction."""
+    tx.run(
+        """
+        MERGE (rm:TreeReadModel {root_id: $root_id})
+        SET rm.user_id = $user_id, rm.revision = 1
+        CREATE (:TreeReadModelEntry {root_id: $root_id, kind: 'node', json: $node})
+        """,
+        {"root_id": root_id, "user_id": user_id, "node": node_entry},
+    ).consume()
+
+
+def append_branch(tx, root_id: str, node_entry: str, relationship_entry: str):
+    """
+    Adds a new node and its incoming edge to the tree's model, inside the
+    branch's write transaction (after tree_revision has been bumped). Only a
+    model that was current before this write is extended; a stale or missing
+    one is left for the reader to rebuild. Costs the same at any tree size.
+    """
+    tx.run(
+        """
+        MATCH (root:InteractionNode {node_id: $root_id})
+        MATCH (rm:TreeReadModel {root_id: $root_id})
+        WHERE rm.revision = root.tree_revision - 1
+        SET rm.revision = root.tree_revision
+        CREATE (:TreeReadModelEntry {root_id: $root_id, kind: 'node', json: $node}),
+               (:TreeReadModelEntry {root_id: $root_id, kind: 'relationship', json: $relationship})
+        """,
+        {"root_id": root_id, "node": node_entry, "relationship": relationship_entry},
+    ).consume()
+
+
+def read_document(
+    db_conn, root_id: str, user_id: str
+) -> Optional[Tuple[int, List[str], List[str]]]:
+    """
+    Returns (revision, node entries, relationship entries) if the tree's model
+    is current, otherwise None. One query, three index seeks.
+    """
+    results = db_conn.query(
+        """
+        MATCH (root:InteractionNode {node_id: $root_id, user_id: $user_id})
+        MATCH (rm:TreeReadModel {root_id: $root_id})
+        WHERE rm.revision = root.tree_revision
+        OPTIONAL MATCH (e:TreeReadModelEntry {root_id: $root_id})
+        WITH rm, collect(e) AS entries
+        RETURN rm.revision AS revision,
+               [e IN entries WHERE e.kind = 'node' | e.json] AS nodes,
+               [e IN entries WHERE e.kind = 'relationship' | e.json] AS relationships
+        """,
+        {"root_id": root_id, "user_id": user_id},
+    )
+    if not results or not results[0] or not results[0]["nodes"]:
+        return None
+    return results[0]["revision"], results[0]["nodes"], results[0]["relationships"]
+
+
+def store_document(
+    db_conn,
+    root_id: str,
+    user_id: str,
+    revision: int,
+    node_entries: List[str],
+    relationship_entries: List[str],
+) -> bool:
+    """
+    Replaces the tree's model with freshly built entries for `revision`, unless
+    the tree has moved on since it was read. Returns True if it was stored.
+    """
+    entries = [{"kind": "node", "json": entry} for entry in node_entries] + [
+        {"kind": "relationship", "json": entry} for entry in relationship_entries
+    ]
+
+    def replace_entries(tx):
+        claimed = list(
+            tx.run(
+                """
+                MATCH (root:InteractionNode {node_id: $root_id, user_id: $user_id})
+                WHERE root.tree_revision = $revision
+                MERGE (rm:TreeReadModel {root_id: $root_id})
+                SET rm.user_id = $user_id, rm.revision = $revision
+                RETURN rm.revision AS revision
+                """,
+                {"root_id": root_id, "user_id": user_id, "revision": revision},
+            )
+        )
+        if not claimed:
+            return False
+        tx.run(
+            "MATCH (e:TreeReadModelEntry {root_id: $root_id}) DELETE e",
+            {"root_id": root_id},
+        ).consume()
+        tx.run(
+            """
+            UNWIND $entries AS entry
+            CREATE (:TreeReadModelEntry {root_id: $root_id, kind: entry.kind, json: entry.json})
+            """,
+            {"root_id": root_id, "entries": entries},
+        ).consume()
+        return True
+
+    return db_conn.write_transaction(replace_entries)
+
+
+def delete_document(db_conn, root_id: str, batch_size: int = 1000):
+    """
+    Removes a tree's model once the tree itself has been deleted. The header
+    goes first, so a partly deleted model is never served.
+    """
+    db_conn.query(
+        "MATCH (rm:TreeReadModel {root_id: $root_id}) DELETE rm", {"root_id": root_id}
+    )
+    while True:
+        results = db_conn.query(
+            """
+            MATCH (e:TreeReadModelEntry {root_id: $root_id})
+            WITH e LIMIT $batch_size
+            DELETE e
+            RETURN count(e) AS deleted
+            """,
+            {"root_id": root_id, "batch_size": batch_size},
+        )
+        if not results or not results[0]["deleted"]:
+            break
+
+
+def ensure_read_model_indexes(db_conn):
+    db_conn.query(
+        "CREATE CONSTRAINT tree_read_model_root_id IF NOT EXISTS "
+        "FOR (rm:TreeReadModel) REQUIRE rm.root_id IS UNIQUE"
+    )
+    db_conn.query(
+        "CREATE INDEX tree_read_model_entry_root_id IF NOT EXISTS "
+        "FOR (e:TreeReadModelEntry) ON (e.root_id)"
+    )
+
+
+def _canonical(document: Dict[str, Any]) -> Dict[str, Any]:
+    # Node and edge order carries no meaning, so compare sorted.
+    return {
+        "nodes": sorted(document["nodes"], key=lambda n: n["node_id"]),
+        "relationships": sorted(
+            document["relationships"], key=lambda r: (r["source"], r["target"])
+        ),
+    }
+
+
+async def check_tree(graph_svc, root_id: str, user_id: str, repair: bool) -> str:
+    """
+    Compares a tree's stored model with the graph. Returns 'ok', 'drifted',
+    'stale' (changed since the model was stored), 'missing' (never read since
+    the model was enabled) or 'untracked' (no tree_revision yet). Only
+    'drifted' indicates a bug; with repair=True, anything but 'ok' and
+    'untracked' is rebuilt.
+    """
+    tree_revision = await graph_svc.get_tree_revision(root_id, user_id)
+    if tree_revision is None or tree_revision["tree_revision"] is None:
+        return "untracked"
+    stored = graph_svc.db_conn.query(
+        """
+        MATCH (rm:TreeReadModel {root_id: $root_id})
+        OPTIONAL MATCH (e:TreeReadModelEntry {root_id: $root_id})
+        WITH rm, collect(e) AS entries
+        RETURN rm.revision AS revision,
+               [e IN entries WHERE e.kind = 'node' | e.json] AS nodes,
+               [e IN entries WHERE e.kind = 'relationship' | e.json] AS relationships
+        """,
+        {"root_id": root_id},
+    )
+
+    graph = None
+    if not stored or not stored[0]["nodes"]:
+        status = "missing"
+    elif stored[0]["revision"] != tree_revision["tree_revision"]:
+        status = "stale"
+    else:
+        graph = await graph_svc.get_interaction_graph(root_id, user_id)
+        document = graph_svc.render_tree_read_model(
+            stored[0]["nodes"], stored[0]["relationships"]
+        )
+        if _canonical(json.loads(document)) != _canonical(
+            json.loads(graph.model_dump_json())
+        ):
+            status = "drifted"
+        else:
+            status = "ok"
+
+    if repair and status != "ok":
+        if graph is None:
+            graph = await graph_svc.get_interaction_graph(root_id, user_id)
+        await graph_svc.store_tree_read_model(
+            root_id, user_id, tree_revision["tree_revision"], graph
+        )
+    return status
+
+
+async def check_all_trees(graph_svc, repair: bool = False) -> Dict[str, int]:
+    roots = graph_svc.db_conn.query(
+        """
+        MATCH (root:InteractionNode)
+        WHERE root.root_id = root.node_id
+        RETURN root.node_id AS root_id, root.user_id AS user_id
+        """
+    )
+    counts: Dict[str, int] = {}
+    for record in roots:
+        status = await check_tree(
+            graph_svc, record["root_id"], record["user_id"], repair
+        )
+        counts[status] = counts.get(status, 0) + 1
+        if status == "drifted":
+            print(f"Tree {record['root_id']}: {status}")
+    return counts
+
+
+if __name__ == "__main__":
+    from db import get_db_connection, close_db_connection
+    from blob_store import create_blob_store_from_env
+    from graph_service import GraphDBService
+
+    repair = "--repair" in sys.argv
+    conn = get_db_connection()
+    try:
+        ensure_read_model_indexes(conn)
+        service = GraphDBService(
+            db_connection=conn,
+            blob_store=create_blob_store_from_env(),
+            read_model_enabled=True,
+        )
+        counts = asyncio.run(check_all_trees(service, repair=repair))
+        print(f"Read model {'repair' if repair else 'check'} complete: {counts}")
+    finally:
+        close_db_connection()
+    if not repair and counts.get("drifted"):
+        sys.exit(1)
@@ -0,0 +1,10 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# The backend is a flat set of top-level modules, imported the same way main.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# main.py builds its OpenAI client at import time.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,473 @@
+# backend/tests/fake_neo4j.py
+"""
+In-memory stand-in for db.Neo4jConnection. Each Cypher statement that
+GraphDBService issues is recognised by a marker substring and evaluated
+against plain dicts with the same semantics, so the service's Python side
+(projection handling, hydration, fallbacks, batching) can be tested without a
+database. Unrecognised statements fail the test.
+"""
+import copy
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from graph_service import NODE_FIELDS
+
+
+class FakeResult(list):
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, conn: "FakeNeo4jConnection"):
+        self._conn = conn
+
+    def run(self, query, parameters=None):
+        return self._conn._run(query, parameters or {})
+
+
+class FakeNeo4jConnection:
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.edges: List[Dict[str, Any]] = []
+        self.queries: List[str] = []
+        # Depths of the nodes removed by each prune batch, in deletion order.
+        self.deleted_batches: List[List[int]] = []
+        # TreeReadModel headers by root_id, and their TreeReadModelEntry nodes.
+        self.read_models: Dict[str, Dict[str, Any]] = {}
+        self.read_model_entries: List[Dict[str, Any]] = []
+        self._handlers = [
+            ("CREATE (i:InteractionNode", self._create_root),
+            ("CREATE (b:InteractionNode", self._create_branch),
+            ("CREATE (p)-[r:BRANCHED_TO", self._link),
+            ("RETURN p.node_id AS id", self._parent_check),
+            ("{node_id: $node_id, user_id: $user_id_param}", self._get_node),
+            ("has_unstamped_nodes", self._graph),
+            ("[:BRANCHED_TO*0..]", self._legacy_graph),
+            ("AS ancestors", self._ancestors),
+            ("RETURN i.revision AS revision", self._node_revision),
+            ("RETURN r.node_id AS root_id, r.tree_revision", self._tree_revision),
+            ("WHERE coalesce(i.revision, 1) = $expected_revision", self._update),
+            ("RETURN s.root_id AS root_id", self._start_root),
+            ("ORDER BY n.depth DESC LIMIT $batch_size", self._delete_descendants),
+            ("DETACH DELETE s", self._delete_start),
+            ("SET rm.user_id = $user_id, rm.revision = 1", self._read_model_init),
+            ("WHERE rm.revision = root.tree_revision - 1", self._read_model_append),
+            ("e.json] AS nodes", self._read_model_read),
+            ("SET rm.user_id = $user_id, rm.revision = $revision", self._read_model_claim),
+            ("UNWIND $entries AS entry", self._read_model_add_entries),
+            ("{root_id: $root_id}) DELETE e", self._read_model_clear),
+            ("WITH e LIMIT $batch_size", self._read_model_delete_entries),
+            ("(rm:TreeReadModel {root_id: $root_id}) DELETE rm", self._read_model_delete),
+            ("WHERE root.root_id = root.node_id", self._roots),
+            ("RETURN p.root_id AS root_id, p.depth AS depth", self._copy_parent),
+            ("AS ancestor_ids\n        ORDER BY n.depth", self._copy_source),
+            ("UNWIND $rows AS row\n        MERGE", self._copy),
+        ]
+
+    # --- Neo4jConnection interface ---
+
+    def query(self, query, parameters=None, db=None):
+        return self._run(query, parameters or {})
+
+    def write_transaction(self, work, db=None):
+        snapshot = copy.deepcopy(
+            (self.nodes, self.edges, self.read_models, self.read_model_entries)
+        )
+        try:
+            return work(FakeTransaction(self))
+        except Exception:
+            (
+                self.nodes,
+                self.edges,
+                self.read_models,
+                self.read_model_entries,
+            ) = snapshot
+            raise
+
+    def _run(self, query, params):
+        self.queries.append(query)
+        for marker, handler in self._handlers:
+            if marker in query:
+                return FakeResult(handler(params))
+        raise AssertionError(f"FakeNeo4jConnection got an unexpected query:\n{query}")
+
+    # --- Seeding helpers ---
+
+    def add_node(self, node_id: str, user_id: str = "user-1", **props) -> Dict[str, Any]:
+        node = {
+            "node_id": node_id,
+            "user_id": user_id,
+            "user_prompt": f"prompt {node_id}",
+            "llm_response": f"response {node_id}",
+            "timestamp": datetime(2024, 1, 1),
+            "is_starting_node": False,
+            **props,
+        }
+        self.nodes[node_id] = node
+        return node
+
+    def add_edge(self, source: str, target: str, **props):
+        self.edges.append(
+            {
+                "source": source,
+                "target": target,
+                "type": "BRANCHED_TO",
+                "properties": {"timestamp": datetime(2024, 1, 1), **props},
+            }
+        )
+
+    def queries_containing(self, marker: str) -> List[str]:
+        return [q for q in self.queries if marker in q]
+
+    # --- Evaluation helpers ---
+
+    @staticmethod
+    def _project(node: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: node.get(field) for field in NODE_FIELDS}
+
+    def _owned(self, node_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        node = self.nodes.get(node_id)
+        return node if node is not None and node.get("user_id") == user_id else None
+
+    def _delete(self, node_ids):
+        for node_id in node_ids:
+            self.nodes.pop(node_id)
+        self.edges = [
+            e for e in self.edges if e["source"] not in node_ids and e["target"] not in node_ids
+        ]
+
+    def _relationship(self, edge: Dict[str, Any]) -> Dict[str, Any]:
+        return copy.deepcopy(edge)
+
+    def _bump_tree_revision(self, root_id: Optional[str]):
+        root = self.nodes.get(root_id) if root_id else None
+        if root is not None:
+            root["tree_revision"] = (root.get("tree_revision") or 0) + 1
+
+    # --- Statement handlers ---
+
+    def _create_root(self, p):
+        node = {
+            "node_id": p["node_id"],
+            "user_prompt": p["user_prompt"],
+            "llm_response": p["llm_response"],
+            "llm_response_blob": p["llm_response_blob"],
+            "timestamp": p["timestamp"],
+            "summary_title": p["summary_title"],
+            "is_starting_node": True,
+            "user_id": p["user_id_param"],
+            "root_id": p["node_id"],
+            "depth": 0,
+            "ancestor_ids": [],
+            "revision": 1,
+            "tree_revision": 1,
+            **p["llm_usage"],
+        }
+        self.nodes[node["node_id"]] = node
+        return [{"node": self._project(node)}]
+
+    def _create_branch(self, p):
+        node = {
+            "node_id": p["node_id"],
+            "user_prompt": p["user_prompt"],
+            "llm_response": p["llm_response"],
+            "llm_response_blob": p["llm_response_blob"],
+            "timestamp": p["timestamp"],
+            "summary_title": p["summary_title"],
+            "is_starting_node": False,
+            "user_id": p["user_id_param"],
+            "context_messages": p["context_messages"],
+            "context_messages_blob": p["context_messages_blob"],
+            "root_id": p["root_id"],
+            "depth": p["depth"],
+            "ancestor_ids": p["ancestor_ids"],
+            "revision": 1,
+            **p["llm_usage"],
+        }
+        self.nodes[node["node_id"]] = node
+        return [{"node": self._project(node)}]
+
+    def _link(self, p):
+        if p["parent_node_id"] not in self.nodes or p["branch_node_id"] not in self.nodes:
+            return []
+        self.add_edge(
+            p["parent_node_id"],
+            p["branch_node_id"],
+            timestamp=p["timestamp"],
+            created_by="user",
+        )
+        self._bump_tree_revision(p["root_id"])
+        return [
+            {
+                "relationship_type": "BRANCHED_TO",
+                "properties": dict(self.edges[-1]["properties"]),
+            }
+        ]
+
+    def _parent_check(self, p):
+        parent = self._owned(p["parent_node_id"], p["user_id"])
+        if parent is None:
+            return []
+        return [
+            {
+                "id": parent["node_id"],
+                "is_starting_node": parent.get("is_starting_node"),
+                "root_id": parent.get("root_id"),
+                "depth": parent.get("depth"),
+                "ancestor_ids": parent.get("ancestor_ids"),
+            }
+        ]
+
+    def _get_node(self, p):
+        node = self._owned(p["node_id"], p["user_id_param"])
+        return [{"node": self._project(node)}] if node is not None else []
+
+    def _graph(self, p):
+        start = self._owned(p["start_node_id"], p["user_id"])
+        if start is None or start.get("root_id") is None:
+            return []
+        members = [
+            n
+            for n in self.nodes.values()
+            if n.get("root_id") == start["root_id"]
+            and n.get("user_id") == start["user_id"]
+            and (n is start or start["node_id"] in (n.get("ancestor_ids") or []))
+        ]
+        member_ids = {n["node_id"] for n in members}
+        relationships = [
+            self._relationship(e)
+            for e in self.edges
+            if e["target"] in member_ids and e["target"] != start["node_id"]
+        ]
+        has_unstamped = any(
+            e["source"] in member_ids and self.nodes[e["target"]].get("root_id") is None
+            for e in self.edges
+        )
+        return [
+            {
+                "nodes": [self._project(n) for n in members],
+                "relationships": relationships,
+                "has_unstamped_nodes": has_unstamped,
+            }
+        ]
+
+    def _legacy_graph(self, p):
+        start = self._owned(p["start_node_id"], p["user_id"])
+        if start is None:
+            return []
+        seen = [start["node_id"]]
+        frontier = [start["node_id"]]
+        while frontier:
+            source = frontier.pop()
+            for e in self.edges:
+                target = self.nodes[e["target"]]
+                if (
+                    e["source"] == source
+                    and target.get("user_id") == start["user_id"]
+                    and e["target"] not in seen
+                ):
+                    seen.append(e["target"])
+                    frontier.append(e["target"])
+        return [
+            {
+                "nodes": [self._project(self.nodes[node_id]) for node_id in seen],
+                "relationships": [
+                    self._relationship(e)
+                    for e in self.edges
+                    if e["source"] in seen and e["target"] in seen
+                ],
+            }
+        ]
+
+    def _ancestors(self, p):
+        node = self._owned(p["node_id"], p["user_id"])
+        if node is None:
+            return []
+        ancestor_ids = node.get("ancestor_ids")
+        ancestors = [
+            self._project(a)
+            for a in self.nodes.values()
+            if a["node_id"] in (ancestor_ids or []) and a.get("user_id") == node["user_id"]
+        ]
+        return [{"ancestor_ids": ancestor_ids, "ancestors": ancestors}]
+
+    def _node_revision(self, p):
+        node = self._owned(p["node_id"], p["user_id"])
+        return [{"revision": node.get("revision")}] if node is not None else []
+
+    def _tree_revision(self, p):
+        start = self._owned(p["start_node_id"], p["user_id"])
+        root = self.nodes.get(start.get("root_id")) if start is not None else None
+        if root is None:
+            return []
+        return [{"root_id": root["node_id"], "tree_revision": root.get("tree_revision")}]
+
+    def _update(self, p):
+        node = self._owned(p["node_id"], p["user_id"])
+        if node is None or (node.get("revision") or 1) != p["expected_revision"]:
+            return []
+        node.update(p["props"])
+        node["revision"] = (node.get("revision") or 1) + 1
+        self._bump_tree_revision(node.get("root_id"))
+        return [{"node": self._project(node)}]
+
+    def _start_root(self, p):
+        node = self._owned(p["node_id"], p["user_id"])
+        return [{"root_id": node.get("root_id")}] if node is not None else []
+
+    def _delete_descendants(self, p):
+        batch = sorted(
+            (
+                n
+                for n in self.nodes.values()
+                if n.get("root_id") == p["root_id"]
+                and n.get("user_id") == p["user_id"]
+                and p["node_id"] in (n.get("ancestor_ids") or [])
+            ),
+            key=lambda n: n["depth"],
+            reverse=True,
+        )[: p["batch_size"]]
+        if batch:
+            self.deleted_batches.append([n["depth"] for n in batch])
+            self._delete({n["node_id"] for n in batch})
+            self._bump_tree_revision(p["root_id"])
+        return [{"deleted": len(batch)}]
+
+    def _delete_start(self, p):
+        if self._owned(p["node_id"], p["user_id"]) is None:
+            return [{"deleted": 0}]
+        self._delete({p["node_id"]})
+        self._bump_tree_revision(p["root_id"])
+        return [{"deleted": 1}]
+
+    def _copy_parent(self, p):
+        parent = self._owned(p["new_parent_id"], p["user_id"])
+        if parent is None:
+            return []
+        return [
+            {
+                "root_id": parent.get("root_id"),
+                "depth": parent.get("depth"),
+                "ancestor_ids": parent.get("ancestor_ids"),
+            }
+        ]
+
+    def _copy_source(self, p):
+        start = self._owned(p["node_id"], p["user_id"])
+        if start is None or start.get("root_id") is None:
+            return []
+        subtree = [
+            n
+            for n in self.nodes.values()
+            if n.get("root_id") == start["root_id"]
+            and n.get("user_id") == p["user_id"]
+            and (n is start or start["node_id"] in (n.get("ancestor_ids") or []))
+        ]
+        fields = (
+            "node_id", "user_prompt", "llm_response", "summary_title",
+            "context_messages", "depth", "llm_response_blob",
+            "context_messages_blob", "ancestor_ids",
+        )
+        return [
+            {field: n.get(field) for field in fields}
+            for n in sorted(subtree, key=lambda n: n["depth"])
+        ]
+
+    def _copy(self, p):
+        copied = 0
+        for row in p["rows"]:
+            if row["node_id"] not in self.nodes:
+                self.nodes[row["node_id"]] = {
+                    "node_id": row["node_id"],
+                    **row["props"],
+                    "timestamp": p["timestamp"],
+                }
+            if row["parent_id"] not in self.nodes:
+                continue
+            if not any(
+                e["source"] == row["parent_id"] and e["target"] == row["node_id"]
+                for e in self.edges
+            ):
+                self.add_edge(
+                    row["parent_id"], row["node_id"],
+                    timestamp=p["timestamp"], created_by="copy",
+                )
+            copied += 1
+        self._bump_tree_revision(p["root_id"])
+        return [{"copied": copied}]
+
+    def _add_read_model_entry(self, root_id: str, kind: str, json_text: str):
+        self.read_model_entries.append({"root_id": root_id, "kind": kind, "json": json_text})
+
+    def _read_model_init(self, p):
+        self.read_models[p["root_id"]] = {"user_id": p["user_id"], "revision": 1}
+        self._add_read_model_entry(p["root_id"], "node", p["node"])
+        return []
+
+    def _read_model_append(self, p):
+        root = self.nodes.get(p["root_id"])
+        rm = self.read_models.get(p["root_id"])
+        if root is None or rm is None or rm["revision"] != root.get("tree_revision") - 1:
+            return []
+        rm["revision"] = root["tree_revision"]
+        self._add_read_model_entry(p["root_id"], "node", p["node"])
+        self._add_read_model_entry(p["root_id"], "relationship", p["relationship"])
+        return []
+
+    def _read_model_read(self, p):
+        rm = self.read_models.get(p["root_id"])
+        if rm is None:
+            return []
+        if "user_id" in p:
+            root = self._owned(p["root_id"], p["user_id"])
+            if root is None or root.get("tree_revision") != rm["revision"]:
+                return []
+        entries = [e for e in self.read_model_entries if e["root_id"] == p["root_id"]]
+        return [
+            {
+                "revision": rm["revision"],
+                "nodes": [e["json"] for e in entries if e["kind"] == "node"],
+                "relationships": [
+                    e["json"] for e in entries if e["kind"] == "relationship"
+                ],
+            }
+        ]
+
+    def _read_model_claim(self, p):
+        root = self._owned(p["root_id"], p["user_id"])
+        if root is None or root.get("tree_revision") != p["revision"]:
+            return []
+        self.read_models[p["root_id"]] = {"user_id": p["user_id"], "revision": p["revision"]}
+        return [{"revision": p["revision"]}]
+
+    def _read_model_add_entries(self, p):
+        for entry in p["entries"]:
+            self._add_read_model_entry(p["root_id"], entry["kind"], entry["json"])
+        return []
+
+    def _read_model_clear(self, p):
+        self.read_model_entries = [
+            e for e in self.read_model_entries if e["root_id"] != p["root_id"]
+        ]
+        return []
+
+    def _read_model_delete_entries(self, p):
+        batch = [e for e in self.read_model_entries if e["root_id"] == p["root_id"]][
+            : p["batch_size"]
+        ]
+        self.read_model_entries = [
+            e for e in self.read_model_entries if not any(e is b for b in batch)
+        ]
+        return [{"deleted": len(batch)}]
+
+    def _read_model_delete(self, p):
+        self.read_models.pop(p["root_id"], None)
+        return []
+
+    def _roots(self, p):
+        return [
+            {"root_id": n["node_id"], "user_id": n["user_id"]}
+            for n in self.nodes.values()
+            if n.get("root_id") == n["node_id"]
+        ]
@@ -0,0 +1,159 @@
+# backend/tests/fake_openai.py
+"""
+A local HTTP server speaking enough of the OpenAI chat completions API for
+AsyncOpenAI(base_url=server.base_url). Each model answers from a script of
+actions (delay, status, content), so tests can inject latency and errors.
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeOpenAIServer:
+    def __init__(self):
+        self._scripts: Dict[str, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+        # (model, monotonic arrival time) per request received.
+        self.requests: List[tuple] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self._scripts.clear()
+            self.requests.clear()
+
+    def script(
+        self,
+        model: str,
+        status: int = 200,
+        delay: float = 0.0,
+        content: str = "ok",
+        times: int = 1,
+    ):
+        """Queues `times` identical responses for `model`; unscripted calls succeed."""
+        with self._lock:
+            for _ in range(times):
+                self._scripts[model].append(
+                    {"status": status, "delay": delay, "content": content}
+                )
+
+    def request_count(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for m, _ in self.requests if model is None or m == model)
+
+    def _next_action(self, model: str) -> dict:
+        with self._lock:
+            self.requests.append((model, time.monotonic()))
+            if self._scripts[model]:
+                return self._scripts[model].popleft()
+        return {"status": 200, "delay": 0.0, "content": "ok"}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                action = server._next_action(body["model"])
+                time.sleep(action["delay"])
+                try:
+                    if action["status"] != 200:
+                        self._send_json(
+                            action["status"],
+                            {"error": {"message": f"injected {action['status']}", "type": "test"}},
+                        )
+                    elif body.get("stream"):
+                        self._send_stream(body["model"], action["content"])
+                    else:
+                        self._send_json(200, _completion(body["model"], action["content"]))
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on this attempt (timeout, hedge, cancel).
+                    pass
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    delta = word if i == len(words) - 1 else word + " "
+                    self._send_event(_chunk(model, {"content": delta}))
+                self._send_event({**_chunk(model, None), "usage": _usage()})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _send_event(self, payload):
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def _usage():
+    return {
+        "prompt_tokens": 12,
+        "completion_tokens": 3,
+        "total_tokens": 15,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": _usage(),
+    }
+
+
+def _chunk(model: str, delta: Optional[dict]) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": (
+            [{"index": 0, "delta": delta, "finish_reason": None}] if delta else []
+        ),
+    }
@@ -0,0 +1,168 @@
+# backend/tests/test_blob_store.py
+import asyncio
+import gzip
+import os
+
+import pytest
+
+import blob_store
+from blob_store import BlobStore, FilesystemBlobBackend, content_hash
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService
+
+
+class CountingBackend(FilesystemBlobBackend):
+    def __init__(self, root_dir):
+        super().__init__(root_dir)
+        self.puts = 0
+        self.gets = 0
+
+    def put(self, key, data):
+        self.puts += 1
+        super().put(key, data)
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def stored_files(root_dir):
+    return [
+        os.path.join(dirpath, name)
+        for dirpath, _, names in os.walk(root_dir)
+        for name in names
+    ]
+
+
+def test_round_trip_is_compressed_and_survives_a_cold_cache(tmp_path):
+    text = "Some explanation of the topic. " * 200
+    key = BlobStore(FilesystemBlobBackend(str(tmp_path))).put_text(text)
+
+    assert key == content_hash(text)
+    [path] = stored_files(tmp_path)
+    assert os.path.basename(path) == key
+    assert os.path.getsize(path) < len(text) / 5
+
+    fresh = BlobStore(FilesystemBlobBackend(str(tmp_path)))
+    assert fresh.get_text(key) == text
+    assert fresh.get_texts([key, key]) == {key: text}
+
+
+def test_gzip_blobs_stay_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "zstandard", None)
+    text = "ünïcode body " * 100
+    key = BlobStore(FilesystemBlobBackend(str(tmp_path))).put_text(text)
+    [path] = stored_files(tmp_path)
+    with open(path, "rb") as f:
+        assert gzip.decompress(f.read()).decode("utf-8") == text
+
+    monkeypatch.undo()
+    assert BlobStore(FilesystemBlobBackend(str(tmp_path))).get_text(key) == text
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    backend = CountingBackend(str(tmp_path))
+    store = BlobStore(backend)
+    text = "The same answer. " * 100
+    keys = {store.put_text(text) for _ in range(3)}
+
+    # A second process with an empty cache still finds the existing blob.
+    BlobStore(backend).put_text(text)
+
+    assert len(keys) == 1
+    assert backend.puts == 1
+    assert len(stored_files(tmp_path)) == 1
+    assert store.put_text(text + "!") != keys.pop()
+    assert backend.puts == 2
+
+
+def test_missing_blobs_are_none_and_left_out_of_batches(tmp_path):
+    backend = CountingBackend(str(tmp_path))
+    store = BlobStore(backend)
+    present = store.put_text("present " * 200)
+    missing = content_hash("never stored")
+
+    assert store.get_text(missing) is None
+    assert BlobStore(backend).get_texts([present, missing]) == {
+        present: "present " * 200
+    }
+
+
+def test_node_reads_hydrate_offloaded_bodies_and_keep_previews_when_missing(tmp_path):
+    conn = FakeNeo4jConnection()
+    store = BlobStore(CountingBackend(str(tmp_path)), offload_min_chars=100)
+    service = GraphDBService(conn, blob_store=store)
+    long_answer = "A long answer. " * 50
+    node = asyncio.run(
+        service.create_root_interaction_node(
+            user_id="user-1",
+            user_prompt="Explain",
+            summary_title=None,
+            llm_response=long_answer,
+        )
+    )
+    stored = conn.nodes[node.node_id]
+    assert stored["llm_response_blob"] == content_hash(long_answer)
+    assert len(stored["llm_response"]) < len(long_answer)
+    # The creator gets the body it just generated back in full.
+    assert node.llm_response == long_answer and node.llm_response_blob is None
+
+    cold = GraphDBService(conn, blob_store=BlobStore(CountingBackend(str(tmp_path))))
+    read = asyncio.run(cold.get_interaction_node_by_id(node.node_id, "user-1"))
+    assert read.llm_response == long_answer
+    assert read.llm_response_blob is None
+
+    for path in stored_files(tmp_path):
+        os.remove(path)
+    cold = GraphDBService(conn, blob_store=BlobStore(CountingBackend(str(tmp_path))))
+    read = asyncio.run(cold.get_interaction_node_by_id(node.node_id, "user-1"))
+    assert read.llm_response == stored["llm_response"]
+    assert read.llm_response_blob == stored["llm_response_blob"]
+
+
+def test_structure_reads_return_previews_and_prompt_chains_hydrate(tmp_path):
+    conn = FakeNeo4jConnection()
+    backend = CountingBackend(str(tmp_path))
+    service = GraphDBService(conn, blob_store=BlobStore(backend, offload_min_chars=100))
+    long_answer = "A long answer. " * 50
+    root = asyncio.run(
+        service.create_root_interaction_node(
+            user_id="user-1", user_prompt="Explain", summary_title=None,
+            llm_response=long_answer,
+        )
+    )
+    child = asyncio.run(
+        service.create_branched_interaction_node(
+            parent_node_id=root.node_id, user_id="user-1", user_prompt="More",
+            summary_title=None, llm_response="short", context_messages=None,
+        )
+    )
+
+    cold = GraphDBService(conn, blob_store=BlobStore(backend))
+    graph = asyncio.run(cold.get_interaction_graph(root.node_id, "user-1"))
+    ancestors = asyncio.run(cold.get_interaction_node_ancestors(child.node_id, "user-1"))
+    assert backend.gets == 0
+    [graph_root] = [n for n in graph.nodes if n.node_id == root.node_id]
+    for preview in (graph_root, ancestors[0]):
+        assert preview.llm_response_blob == content_hash(long_answer)
+        assert len(preview.llm_response) < len(long_answer)
+
+    chain = asyncio.run(
+        cold.get_interaction_node_ancestors(child.node_id, "user-1", hydrate=True)
+    )
+    assert chain[0].llm_response == long_answer
+    assert backend.gets == 1
+
+
+def test_fs_backend_requires_an_explicit_path(monkeypatch, tmp_path):
+    monkeypatch.setenv("BLOB_STORE_BACKEND", "fs")
+    monkeypatch.delenv("BLOB_STORE_PATH", raising=False)
+    with pytest.raises(ValueError, match="BLOB_STORE_PATH"):
+        blob_store.create_blob_store_from_env()
+
+    monkeypatch.setenv("BLOB_STORE_PATH", str(tmp_path / "blobs"))
+    store = blob_store.create_blob_store_from_env()
+    assert store.backend.root_dir == str(tmp_path / "blobs")
+
+    monkeypatch.delenv("BLOB_STORE_BACKEND")
+    assert blob_store.create_blob_store_from_env() is None
@@ -0,0 +1,137 @@
+# backend/tests/test_graph_reads.py
+import asyncio
+from datetime import datetime
+
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService, node_projection
+import models
+
+
+def build_tree(service):
+    """root -> a -> a1, root -> b, created through the service."""
+
+    async def build():
+        root = await service.create_root_interaction_node(
+            "user-1", "root prompt", "Root", "root response"
+        )
+        a = await service.create_branched_interaction_node(
+            root.node_id, "user-1", "a prompt", "A", "a response",
+            [models.Message(role="user", content="hi")],
+        )
+        a1 = await service.create_branched_interaction_node(
+            a.node_id, "user-1", "a1 prompt", "A1", "a1 response", None
+        )
+        b = await service.create_branched_interaction_node(
+            root.node_id, "user-1", "b prompt", "B", "b response", None
+        )
+        return root, a, a1, b
+
+    return asyncio.run(build())
+
+
+def node_ids(graph):
+    return sorted(n.node_id for n in graph.nodes)
+
+
+def edge_pairs(graph):
+    return sorted((r.source, r.target) for r in graph.relationships)
+
+
+def test_node_projection_lists_every_field():
+    projection = node_projection("n")
+    assert projection.startswith("n {.node_id, ")
+    assert ".context_messages_blob}" in projection
+
+
+def test_branch_materializes_tree_fields():
+    service = GraphDBService(FakeNeo4jConnection())
+    root, a, a1, b = build_tree(service)
+
+    assert (a1.root_id, a1.depth, a1.ancestor_ids) == (
+        root.node_id, 2, [root.node_id, a.node_id]
+    )
+    assert a.context_messages == [models.Message(role="user", content="hi")]
+    assert service.db_conn.nodes[root.node_id]["tree_revision"] == 4
+
+
+def test_graph_read_uses_root_id_seek():
+    service = GraphDBService(FakeNeo4jConnection())
+    root, a, a1, b = build_tree(service)
+
+    graph = asyncio.run(service.get_interaction_graph(root.node_id, "user-1"))
+    assert node_ids(graph) == sorted([root.node_id, a.node_id, a1.node_id, b.node_id])
+    assert edge_pairs(graph) == sorted(
+        [(root.node_id, a.node_id), (a.node_id, a1.node_id), (root.node_id, b.node_id)]
+    )
+
+    subtree = asyncio.run(service.get_interaction_graph(a.node_id, "user-1"))
+    assert node_ids(subtree) == sorted([a.node_id, a1.node_id])
+    assert edge_pairs(subtree) == [(a.node_id, a1.node_id)]
+    assert not service.db_conn.queries_containing("[:BRANCHED_TO*0..]")
+
+
+def test_graph_read_of_other_users_node_is_none():
+    service = GraphDBService(FakeNeo4jConnection())
+    root, _, _, _ = build_tree(service)
+
+    assert asyncio.run(service.get_interaction_graph(root.node_id, "user-2")) is None
+
+
+def test_graph_read_traverses_legacy_tree():
+    conn = FakeNeo4jConnection()
+    conn.add_node("r", is_starting_node=True)
+    conn.add_node("c")
+    conn.add_edge("r", "c")
+    service = GraphDBService(conn)
+
+    graph = asyncio.run(service.get_interaction_graph("r", "user-1"))
+    assert node_ids(graph) == ["c", "r"]
+    assert edge_pairs(graph) == [("r", "c")]
+    assert conn.queries_containing("[:BRANCHED_TO*0..]")
+
+
+def test_graph_read_falls_back_when_backfill_was_interrupted():
+    # Roots and the first level were stamped, deeper levels were not.
+    conn = FakeNeo4jConnection()
+    conn.add_node("r", is_starting_node=True, root_id="r", depth=0, ancestor_ids=[])
+    conn.add_node("c", root_id="r", depth=1, ancestor_ids=["r"])
+    conn.add_node("g")
+    conn.add_node("gg")
+    conn.add_edge("r", "c")
+    conn.add_edge("c", "g")
+    conn.add_edge("g", "gg")
+    service = GraphDBService(conn)
+
+    graph = asyncio.run(service.get_interaction_graph("r", "user-1"))
+    assert node_ids(graph) == ["c", "g", "gg", "r"]
+    assert edge_pairs(graph) == [("c", "g"), ("g", "gg"), ("r", "c")]
+
+
+def test_ancestors_are_ordered_root_first():
+    service = GraphDBService(FakeNeo4jConnection())
+    root, a, a1, _ = build_tree(service)
+
+    ancestors = asyncio.run(service.get_interaction_node_ancestors(a1.node_id, "user-1"))
+    assert [n.node_id for n in ancestors] == [root.node_id, a.node_id]
+    assert ancestors[1].context_messages == [models.Message(role="user", content="hi")]
+
+    assert asyncio.run(service.get_interaction_node_ancestors(root.node_id, "user-1")) == []
+    assert asyncio.run(service.get_interaction_node_ancestors(a1.node_id, "user-2")) is None
+
+
+def test_node_read_normalizes_stored_values():
+    datetime_value = datetime(2024, 5, 1, 12, 0)
+
+    class Neo4jDateTime:
+        def to_native(self):
+            return datetime_value
+
+    conn = FakeNeo4jConnection()
+    conn.add_node(
+        "n",
+        timestamp=Neo4jDateTime(),
+        context_messages='[{"role": "assistant", "content": "x"}]',
+    )
+    node = asyncio.run(GraphDBService(conn).get_interaction_node_by_id("n", "user-1"))
+    assert node.timestamp == datetime_value
+    assert node.context_messages == [models.Message(role="assistant", content="x")]
@@ -0,0 +1,201 @@
+# backend/tests/test_http_cache.py
+import gzip
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+import main
+from compression import CompressionMiddleware
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService
+from http_cache import if_none_match_matches, make_etag
+
+USER = {"X-User-ID": "user-1"}
+
+
+@pytest.fixture
+def conn():
+    return FakeNeo4jConnection()
+
+
+@pytest.fixture
+def client(conn):
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def seed_tree(conn, size, body_chars=2000):
+    """A stamped tree of `size` nodes where node i branches from node (i - 1) // 4."""
+    ancestors = {0: []}
+    for i in range(size):
+        if i:
+            parent = (i - 1) // 4
+            ancestors[i] = ancestors[parent] + [f"n{parent}"]
+            conn.add_edge(f"n{parent}", f"n{i}")
+        conn.add_node(
+            f"n{i}",
+            root_id="n0",
+            depth=len(ancestors[i]),
+            ancestor_ids=ancestors[i],
+            revision=1,
+            is_starting_node=i == 0,
+            llm_response=f"Response {i}: " + "explanation of the topic " * (body_chars // 25),
+        )
+    conn.nodes["n0"]["tree_revision"] = 1
+
+
+def test_if_none_match_ignores_encoding_suffix_and_weakness():
+    etag = make_etag("graph", "n0", "n0", 3)
+    assert if_none_match_matches(f'{etag[:-1]}-gzip"', etag)
+    assert if_none_match_matches(f'W/{etag[:-1]}-br"', etag)
+    assert if_none_match_matches(f'"other", {etag}', etag)
+    assert if_none_match_matches("*", etag)
+    assert not if_none_match_matches(make_etag("graph", "n0", "n0", 4), etag)
+
+
+def test_node_read_returns_304_for_current_etag(client, conn):
+    seed_tree(conn, 3)
+    first = client.get("/interaction-nodes/n1", headers=USER)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    conn.queries.clear()
+    revalidated = client.get(
+        "/interaction-nodes/n1", headers={**USER, "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    # The node was too small to compress, so its bare ETag is echoed as is.
+    assert revalidated.headers["etag"] == etag
+    # Only the revision lookup ran, not the full node read.
+    assert len(conn.queries) == 1
+
+    conn.nodes["n1"]["revision"] = 2
+    changed = client.get("/interaction-nodes/n1", headers={**USER, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_graph_read_revalidates_gzip_etag_until_tree_changes(client, conn):
+    seed_tree(conn, 20)
+    headers = {**USER, "Accept-Encoding": "gzip"}
+    first = client.get("/interaction-nodes/n0/graph", headers=headers)
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    etag = first.headers["etag"]
+    assert etag.endswith('-gzip"')
+
+    revalidated = client.get(
+        "/interaction-nodes/n0/graph", headers={**headers, "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    # The 304 carries the same validator and Vary as the 200 it revalidates.
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.headers["vary"] == first.headers["vary"] == "Accept-Encoding"
+
+    conn.nodes["n0"]["tree_revision"] = 2
+    changed = client.get(
+        "/interaction-nodes/n0/graph", headers={**headers, "If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+
+
+def test_repeated_large_tree_reads_cost_few_bytes_and_little_cpu(client, conn):
+    seed_tree(conn, 300)
+    headers = {**USER, "Accept-Encoding": "gzip"}
+
+    start = time.process_time()
+    full_reads = [
+        client.get("/interaction-nodes/n0/graph", headers=headers) for _ in range(5)
+    ]
+    full_read_cpu = time.process_time() - start
+    first = full_reads[0]
+    raw_size = len(first.content)
+    wire_size = int(first.headers["content-length"])
+    assert wire_size < raw_size / 5
+
+    conn.queries.clear()
+    start = time.process_time()
+    revalidations = [
+        client.get(
+            "/interaction-nodes/n0/graph",
+            headers={**headers, "If-None-Match": first.headers["etag"]},
+        )
+        for _ in range(5)
+    ]
+    revalidation_cpu = time.process_time() - start
+
+    assert all(r.status_code == 304 and r.content == b"" for r in revalidations)
+    # One indexed revision lookup per request and no tree read or encoding.
+    assert len(conn.queries) == 5
+    assert not conn.queries_containing("has_unstamped_nodes")
+    assert revalidation_cpu < full_read_cpu / 2
+
+
+def make_app(body: bytes, headers: dict):
+    async def endpoint(request):
+        return Response(body, media_type="application/json", headers=headers)
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    return TestClient(app)
+
+
+def test_compression_suffixes_strong_etag():
+    body = b'{"text": "' + b"a" * 500 + b'"}'
+    response = make_app(body, {"ETag": '"abc"'}).get(
+        "/", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(body)
+    assert response.content == body
+
+
+def test_compression_leaves_weak_etag_and_small_bodies_alone():
+    body = b'{"text": "' + b"a" * 500 + b'"}'
+    weak = make_app(body, {"ETag": 'W/"abc"'}).get(
+        "/", headers={"Accept-Encoding": "gzip"}
+    )
+    assert weak.headers["content-encoding"] == "gzip"
+    assert weak.headers["etag"] == 'W/"abc"'
+
+    small = make_app(b"{}", {"ETag": '"abc"'}).get(
+        "/", headers={"Accept-Encoding": "gzip"}
+    )
+    assert "content-encoding" not in small.headers
+    assert small.headers["etag"] == '"abc"'
+
+    identity = make_app(body, {"ETag": '"abc"'}).get(
+        "/", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"abc"'
+
+
+def test_compression_skips_already_encoded_response():
+    body = gzip.compress(b'{"text": "' + b"a" * 500 + b'"}')
+    response = make_app(
+        body, {"ETag": '"abc-gzip"', "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    ).get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == gzip.decompress(body)
+
+
+def test_compression_prefers_brotli_when_installed():
+    pytest.importorskip("brotli")
+    body = b'{"text": "' + b"a" * 500 + b'"}'
+    response = make_app(body, {"ETag": '"abc"'}).get(
+        "/", headers={"Accept-Encoding": "gzip, br"}
+    )
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["etag"] == '"abc-br"'
@@ -0,0 +1,351 @@
+# backend/tests/test_llm_client.py
+import asyncio
+import time
+
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+import llm_client
+from fake_openai import FakeOpenAIServer
+from llm_client import (
+    CircuitBreaker,
+    LatencyWindow,
+    LLMUnavailableError,
+    ResilientLLMClient,
+)
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FakeOpenAIServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def reset_server(server):
+    server.reset()
+
+
+def run(server, make_client, coroutine_fn):
+    """Runs coroutine_fn(client) with a ResilientLLMClient bound to the fake server."""
+
+    async def main():
+        openai_client = AsyncOpenAI(
+            api_key="test-key", base_url=server.base_url, max_retries=0
+        )
+        try:
+            return await coroutine_fn(make_client(openai_client))
+        finally:
+            await openai_client.close()
+
+    return asyncio.run(main())
+
+
+def test_retries_retryable_errors_with_full_jitter(server, monkeypatch):
+    server.script("primary", status=500)
+    server.script("primary", status=429)
+    bounds = []
+
+    def fake_uniform(low, high):
+        bounds.append((low, high))
+        return high
+
+    monkeypatch.setattr(llm_client.random, "uniform", fake_uniform)
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client, model="primary", max_retries=2, backoff_base_seconds=0.01
+        )
+        return client
+
+    completion = run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+
+    assert completion.choices[0].message.content == "ok"
+    assert server.request_count("primary") == 3
+    # Each retry sleeps up to the doubling cap, drawn uniformly from zero.
+    assert bounds == [(0, 0.01), (0, 0.02)]
+    assert client.metrics.snapshot()["retry:primary"] == 2
+
+
+def test_rejected_request_is_not_retried_or_counted_against_circuit(server):
+    server.script("primary", status=400)
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client,
+            model="primary",
+            fallback_model="fallback",
+            circuit_breaker=CircuitBreaker(failure_threshold=1),
+        )
+        return client
+
+    with pytest.raises(openai.BadRequestError):
+        run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert server.request_count() == 1
+    assert client.circuit_breaker.state == "closed"
+
+
+def test_hedge_wins_over_slow_primary(server):
+    server.script("primary", delay=2.0, content="slow")
+    server.script("primary", delay=0.0, content="hedged")
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client, model="primary", hedge_delay_seconds=0.05
+        )
+        return client
+
+    started = time.monotonic()
+    completion = run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+
+    assert completion.choices[0].message.content == "hedged"
+    assert time.monotonic() - started < 1.0
+    snapshot = client.metrics.snapshot()
+    assert snapshot["hedge_sent:primary"] == 1
+    assert snapshot["hedge_won:primary"] == 1
+
+
+def test_fast_primary_sends_no_hedge(server):
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client, model="primary", hedge_delay_seconds=0.5
+        )
+        return client
+
+    run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert server.request_count() == 1
+    assert "hedge_sent:primary" not in client.metrics.snapshot()
+
+
+def test_hedge_delay_follows_the_models_p95_above_the_floor():
+    latencies = LatencyWindow(size=100, min_samples=10)
+    client = ResilientLLMClient(
+        AsyncOpenAI(api_key="test-key"), hedge_delay_seconds=0.5, latencies=latencies
+    )
+    for _ in range(9):
+        latencies.record("slow", 0.1)
+        latencies.record("fast", 0.1)
+    # Too few samples yet: the configured delay applies.
+    assert client.hedge_delay("slow") == 0.5
+
+    for i in range(91):
+        latencies.record("slow", 1.0 + i / 100)
+        latencies.record("fast", 0.1)
+    assert latencies.percentile("slow", 95) == pytest.approx(1.85)
+    assert client.hedge_delay("slow") == pytest.approx(1.85)
+    assert client.hedge_delay("fast") == 0.5
+
+
+def test_primary_within_its_learned_p95_is_not_hedged(server):
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client,
+            model="primary",
+            hedge_delay_seconds=0.05,
+            latencies=LatencyWindow(min_samples=3),
+        )
+        for _ in range(3):
+            client.latencies.record("primary", 1.0)
+        return client
+
+    server.script("primary", delay=0.3)
+    run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert server.request_count() == 1
+    assert "hedge_sent:primary" not in client.metrics.snapshot()
+
+
+def test_default_deadline_fits_the_lambda_timeout(monkeypatch):
+    for name in ("LLM_DEADLINE_SECONDS", "LLM_ATTEMPT_TIMEOUT_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+    client = ResilientLLMClient.from_env(AsyncOpenAI(api_key="test-key"))
+    # API Gateway gives up at about 29s; Neo4j work happens around the call.
+    assert client.deadline_seconds < 29
+    assert client.attempt_timeout_seconds * 2 <= client.deadline_seconds
+
+
+def test_circuit_opens_fails_fast_and_closes_after_trial(server):
+    server.script("primary", status=503, times=2)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client, model="primary", max_retries=0, circuit_breaker=breaker
+        )
+
+    async def scenario(client):
+        for _ in range(2):
+            with pytest.raises(LLMUnavailableError):
+                await client.create_chat_completion(MESSAGES)
+        assert breaker.state == "open"
+
+        with pytest.raises(LLMUnavailableError):
+            await client.create_chat_completion(MESSAGES)
+        assert server.request_count() == 2  # Rejected without a request.
+
+        await asyncio.sleep(0.25)
+        assert breaker.state == "half_open"
+        await client.create_chat_completion(MESSAGES)
+        assert breaker.state == "closed"
+
+    run(server, make, scenario)
+    assert server.request_count() == 3
+
+
+def test_failed_trial_reopens_circuit(server):
+    server.script("primary", status=500, times=2)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client, model="primary", max_retries=0, circuit_breaker=breaker
+        )
+
+    async def scenario(client):
+        with pytest.raises(LLMUnavailableError):
+            await client.create_chat_completion(MESSAGES)
+        await asyncio.sleep(0.15)
+        with pytest.raises(LLMUnavailableError):
+            await client.create_chat_completion(MESSAGES)
+        assert breaker.state == "open"
+
+    run(server, make, scenario)
+
+
+def test_cancelled_trial_frees_half_open_slot(server):
+    server.script("primary", status=500)
+    server.script("primary", delay=2.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client, model="primary", max_retries=0, circuit_breaker=breaker
+        )
+
+    async def scenario(client):
+        with pytest.raises(LLMUnavailableError):
+            await client.create_chat_completion(MESSAGES)
+        await asyncio.sleep(0.15)
+
+        trial = asyncio.ensure_future(client.create_chat_completion(MESSAGES))
+        await asyncio.sleep(0.1)
+        assert not breaker.allow_request()  # The trial holds the slot.
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        assert breaker.state == "half_open"
+        assert breaker.allow_request()
+
+    run(server, make, scenario)
+
+
+def test_falls_back_when_primary_keeps_failing(server):
+    server.script("primary", status=500, times=3)
+    client = None
+
+    def make(openai_client):
+        nonlocal client
+        client = ResilientLLMClient(
+            openai_client,
+            model="primary",
+            fallback_model="fallback",
+            max_retries=2,
+            backoff_base_seconds=0.01,
+        )
+        return client
+
+    completion = run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+
+    assert completion.model == "fallback"
+    assert server.request_count("primary") == 3
+    assert client.metrics.snapshot()["fallback:fallback"] == 1
+
+
+def test_open_circuit_routes_straight_to_fallback(server):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client,
+            model="primary",
+            fallback_model="fallback",
+            circuit_breaker=breaker,
+        )
+
+    completion = run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert completion.model == "fallback"
+    assert server.request_count("primary") == 0
+
+
+def test_fallback_stays_within_deadline(server):
+    server.script("primary", delay=3.0)
+    server.script("fallback", delay=0.1)
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client,
+            model="primary",
+            fallback_model="fallback",
+            deadline_seconds=0.6,
+            fallback_reserve_seconds=0.3,
+        )
+
+    started = time.monotonic()
+    completion = run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert completion.model == "fallback"
+    assert time.monotonic() - started < 0.6 + 0.2
+
+
+def test_slow_fallback_does_not_overrun_deadline(server):
+    server.script("primary", delay=3.0)
+    server.script("fallback", delay=3.0)
+
+    def make(openai_client):
+        return ResilientLLMClient(
+            openai_client,
+            model="primary",
+            fallback_model="fallback",
+            deadline_seconds=0.6,
+            fallback_reserve_seconds=0.3,
+            attempt_timeout_seconds=5.0,
+        )
+
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        run(server, make, lambda c: c.create_chat_completion(MESSAGES))
+    assert time.monotonic() - started < 0.6 + 0.2
+
+
+def test_streams_deltas_and_usage(server):
+    server.script("primary", content="one two three")
+    deltas = []
+
+    async def on_delta(delta, attempt):
+        deltas.append((delta, attempt))
+
+    def make(openai_client):
+        return ResilientLLMClient(openai_client, model="primary")
+
+    completion = run(
+        server, make, lambda c: c.create_chat_completion(MESSAGES, on_delta=on_delta)
+    )
+    assert completion.choices[0].message.content == "one two three"
+    assert deltas == [("one ", 0), ("two ", 0), ("three", 0)]
+    assert completion.usage.prompt_tokens == 12
@@ -0,0 +1,136 @@
+# backend/tests/test_prompts.py
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import models
+import prompts
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService
+
+
+def node(i, response_chars=10):
+    return models.InteractionNode(
+        node_id=f"n{i}",
+        user_prompt=f"q{i}",
+        llm_response="x" * response_chars,
+        is_starting_node=i == 0,
+        user_id="user-1",
+    )
+
+
+def history(messages):
+    return [m["content"] for m in messages[1:-1] if m["role"] == "user"]
+
+
+def test_siblings_share_a_byte_identical_prefix():
+    chain = [node(0), node(1)]
+    first = prompts.build_branch_messages("left?", chain)
+    second = prompts.build_branch_messages("right?", chain)
+    assert first[:-1] == second[:-1]
+    assert history(first) == ["q0", "q1"]
+    assert first[-1] == {"role": "user", "content": "left?"}
+
+
+def test_deep_chain_is_trimmed_to_budget_keeping_root_and_recent_turns():
+    chain = [node(i, response_chars=1000) for i in range(10)]
+    budget = len(prompts.SYSTEM_PROMPTS[prompts.BRANCH_PROMPT_VERSION]) + 4500
+    messages = prompts.build_branch_messages("next?", chain, char_budget=budget)
+
+    assert history(messages) == ["q0", "q7", "q8", "q9"]
+    assert sum(len(m["content"]) for m in messages) <= budget
+    # The trimmed prompt is still a pure function of the chain.
+    assert messages[:-1] == prompts.build_branch_messages(
+        "other?", chain, char_budget=budget
+    )[:-1]
+
+
+def test_client_context_is_used_only_without_a_chain_and_is_budgeted():
+    context = [models.Message(role="user", content="u" * 50)] + [
+        models.Message(role="assistant", content=f"a{i}" * 20) for i in range(5)
+    ]
+    messages = prompts.build_branch_messages("next?", None, context_messages=context)
+    assert len(messages) == 1 + len(context) + 1
+
+    budget = len(prompts.SYSTEM_PROMPTS[prompts.BRANCH_PROMPT_VERSION]) + 100
+    trimmed = prompts.build_branch_messages(
+        "next?", None, context_messages=context, char_budget=budget
+    )
+    assert [m["content"] for m in trimmed[1:-1]] == ["a4" * 20]
+
+    with_chain = prompts.build_branch_messages("next?", [node(0)], context)
+    assert history(with_chain) == ["q0"]
+
+
+class StubLLMClient:
+    def __init__(self, error=None):
+        self.error = error
+        self.messages = None
+
+    async def create_chat_completion(self, messages, on_delta=None, **kwargs):
+        self.messages = messages
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(
+            model="stub",
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content="answer"))],
+        )
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = FakeNeo4jConnection()
+    conn.add_node(
+        "r", root_id="r", depth=0, ancestor_ids=[], revision=1,
+        tree_revision=1, is_starting_node=True,
+    )
+    conn.add_node("legacy", is_starting_node=True, revision=1)
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+    yield conn
+    main.app.dependency_overrides.clear()
+
+
+def post_branch(parent_id, llm, monkeypatch):
+    monkeypatch.setattr(main, "llm_client", llm)
+    return TestClient(main.app).post(
+        f"/interaction-nodes/{parent_id}/branch",
+        json={
+            "user_prompt": "Why?",
+            "context_messages": [{"role": "user", "content": "ignored"}],
+        },
+        headers={"X-User-ID": "user-1"},
+    )
+
+
+def test_branch_of_materialized_tree_does_not_store_ignored_context(conn, monkeypatch):
+    llm = StubLLMClient()
+    response = post_branch("r", llm, monkeypatch)
+    assert response.status_code == 201
+    assert response.json()["context_messages"] is None
+    assert "ignored" not in [m["content"] for m in llm.messages]
+    assert conn.nodes[response.json()["node_id"]]["context_messages"] is None
+
+
+def test_branch_of_legacy_tree_stores_the_context_it_sent(conn, monkeypatch):
+    llm = StubLLMClient()
+    response = post_branch("legacy", llm, monkeypatch)
+    assert response.status_code == 201
+    assert "ignored" in [m["content"] for m in llm.messages]
+    assert response.json()["context_messages"] == [{"role": "user", "content": "ignored"}]
+
+
+def test_provider_rejection_is_a_400_not_a_500(conn, monkeypatch):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    error = openai.BadRequestError(
+        "This model's maximum context length is 128000 tokens.",
+        response=httpx.Response(400, request=request),
+        body={"code": "context_length_exceeded"},
+    )
+    response = post_branch("r", StubLLMClient(error=error), monkeypatch)
+    assert response.status_code == 400
+    assert "maximum context length" in response.json()["detail"]
@@ -0,0 +1,228 @@
+# backend/tests/test_read_model.py
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import models
+import read_model
+from blob_store import BlobStore, FilesystemBlobBackend
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService
+
+LONG_ANSWER = "A long and detailed answer about the topic. " * 40
+APPEND_MARKER = "WHERE rm.revision = root.tree_revision - 1"
+READ_MARKER = "e.json] AS nodes"
+
+
+def make_service(conn, tmp_path):
+    store = BlobStore(FilesystemBlobBackend(str(tmp_path)), offload_min_chars=500)
+    return GraphDBService(conn, blob_store=store, read_model_enabled=True)
+
+
+def grow_tree(service, branches=6):
+    """A root plus `branches` nodes, each under the previous one or the root."""
+    root = asyncio.run(
+        service.create_root_interaction_node(
+            user_id="user-1",
+            user_prompt="Explain graphs",
+            summary_title="Graphs",
+            llm_response=LONG_ANSWER,
+        )
+    )
+    parent_id = root.node_id
+    for i in range(branches):
+        node = asyncio.run(
+            service.create_branched_interaction_node(
+                parent_node_id=parent_id if i % 2 else root.node_id,
+                user_id="user-1",
+                user_prompt=f"Follow-up {i}",
+                summary_title=None,
+                llm_response=LONG_ANSWER + str(i) if i % 3 == 0 else f"short {i}",
+                context_messages=(
+                    [models.Message(role="user", content="c" * 600)] if i == 1 else None
+                ),
+            )
+        )
+        parent_id = node.node_id
+    return root.node_id
+
+
+def canonical(document):
+    return read_model._canonical(document)
+
+
+def graph_document(service, root_id):
+    graph = asyncio.run(service.get_interaction_graph(root_id, "user-1"))
+    return json.loads(graph.model_dump_json())
+
+
+def test_appended_model_matches_the_graph_read(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service)
+
+    document = asyncio.run(service.get_tree_read_model(root_id, "user-1"))
+    assert document is not None
+    assert canonical(json.loads(document)) == canonical(graph_document(service, root_id))
+
+
+def test_entries_keep_previews_and_writes_never_reread_the_tree(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service, branches=6)
+
+    # Each branch adds exactly its own node and edge, without loading the model.
+    assert len(conn.queries_containing(APPEND_MARKER)) == 6
+    assert conn.queries_containing(READ_MARKER) == []
+    assert len(conn.read_model_entries) == 1 + 2 * 6
+    assert conn.read_models[root_id]["revision"] == conn.nodes[root_id]["tree_revision"]
+
+    for entry in conn.read_model_entries:
+        assert LONG_ANSWER not in entry["json"]
+        assert "c" * 600 not in entry["json"]
+    offloaded = [
+        entry
+        for entry in (json.loads(e["json"]) for e in conn.read_model_entries)
+        if entry.get("llm_response_blob")
+    ]
+    assert len(offloaded) == 1 + 2  # The root and branches 0 and 3.
+
+
+def test_render_splices_entries_without_fetching_blobs(tmp_path, monkeypatch):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service, branches=6)
+    _, node_entries, relationship_entries = read_model.read_document(
+        conn, root_id, "user-1"
+    )
+    monkeypatch.setattr(service.blob_store, "get_texts", None)
+
+    document = service.render_tree_read_model(node_entries, relationship_entries)
+    for entry in node_entries + relationship_entries:
+        assert entry.encode("utf-8") in document
+    assert LONG_ANSWER.encode("utf-8") not in document
+
+
+def test_stale_model_is_not_served_and_rebuilds_to_the_graph(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service, branches=3)
+    asyncio.run(
+        service.update_interaction_node(
+            root_id,
+            "user-1",
+            models.InteractionNodeUpdate(summary_title="Renamed", expected_revision=1),
+        )
+    )
+    assert asyncio.run(service.get_tree_read_model(root_id, "user-1")) is None
+
+    graph = asyncio.run(service.get_interaction_graph(root_id, "user-1"))
+    revision = conn.nodes[root_id]["tree_revision"]
+    assert asyncio.run(service.store_tree_read_model(root_id, "user-1", revision, graph))
+    assert len(conn.read_model_entries) == 1 + 2 * 3
+
+    document = asyncio.run(service.get_tree_read_model(root_id, "user-1"))
+    assert canonical(json.loads(document)) == canonical(graph_document(service, root_id))
+    assert asyncio.run(
+        service.store_tree_read_model(root_id, "user-1", revision - 1, graph)
+    ) is False
+
+
+def test_pruning_the_root_deletes_the_model(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service, branches=4)
+    asyncio.run(service.prune_subtree(root_id, "user-1"))
+    assert conn.read_models == {}
+    assert conn.read_model_entries == []
+
+
+def test_check_reports_only_drift_as_failure(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    ok_root = grow_tree(service, branches=2)
+    stale_root = grow_tree(service, branches=2)
+    drifted_root = grow_tree(service, branches=2)
+    conn.add_node(
+        "never-read", root_id="never-read", depth=0, ancestor_ids=[],
+        revision=1, tree_revision=1, is_starting_node=True,
+    )
+    conn.add_node("legacy", root_id="legacy", is_starting_node=True)
+
+    asyncio.run(
+        service.update_interaction_node(
+            stale_root,
+            "user-1",
+            models.InteractionNodeUpdate(summary_title="Renamed", expected_revision=1),
+        )
+    )
+    entry = next(
+        e for e in conn.read_model_entries
+        if e["root_id"] == drifted_root and json.loads(e["json"])["node_id"] == drifted_root
+    )
+    entry["json"] = entry["json"].replace('"Graphs"', '"Tampered"')
+
+    counts = asyncio.run(read_model.check_all_trees(service))
+    assert counts == {"ok": 1, "stale": 1, "drifted": 1, "missing": 1, "untracked": 1}
+
+    asyncio.run(read_model.check_all_trees(service, repair=True))
+    counts = asyncio.run(read_model.check_all_trees(service))
+    assert counts == {"ok": 4, "untracked": 1}
+    assert ok_root in conn.read_models
+
+
+@pytest.fixture
+def client(tmp_path):
+    conn = FakeNeo4jConnection()
+    service = make_service(conn, tmp_path)
+    root_id = grow_tree(service)
+    main.app.dependency_overrides[main.get_graph_service] = lambda: service
+    yield TestClient(main.app), conn, service, root_id
+    main.app.dependency_overrides.clear()
+
+
+def test_graph_endpoint_serves_previews_and_the_node_endpoint_full_bodies(client):
+    test_client, conn, service, root_id = client
+    headers = {"X-User-ID": "user-1", "Accept-Encoding": "gzip"}
+    conn.queries.clear()
+
+    response = test_client.get(f"/interaction-nodes/{root_id}/graph", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert conn.queries_containing("has_unstamped_nodes") == []
+    served = response.json()
+    assert canonical(served) == canonical(graph_document(service, root_id))
+    [offloaded_root] = [n for n in served["nodes"] if n["node_id"] == root_id]
+    assert offloaded_root["llm_response_blob"]
+    assert LONG_ANSWER.startswith(offloaded_root["llm_response"].rstrip("…"))
+
+    node = test_client.get(f"/interaction-nodes/{root_id}", headers=headers).json()
+    assert node["llm_response"] == LONG_ANSWER
+    assert node["llm_response_blob"] is None
+
+    revalidated = test_client.get(
+        f"/interaction-nodes/{root_id}/graph",
+        headers={**headers, "If-None-Match": response.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_graph_endpoint_rebuilds_a_stale_model(client):
+    test_client, conn, service, root_id = client
+    conn.nodes[root_id]["tree_revision"] += 1
+    conn.queries.clear()
+
+    response = test_client.get(
+        f"/interaction-nodes/{root_id}/graph",
+        headers={"X-User-ID": "user-1", "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 200
+    assert len(conn.queries_containing("has_unstamped_nodes")) == 1
+    assert conn.read_models[root_id]["revision"] == conn.nodes[root_id]["tree_revision"]
+    assert canonical(response.json()) == canonical(
+        json.loads(asyncio.run(service.get_tree_read_model(root_id, "user-1")))
+    )
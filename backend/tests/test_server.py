@@ -0,0 +1,172 @@
+# backend/tests/test_server.py
+import asyncio
+import importlib.util
+import json
+import os
+import signal
+
+import pytest
+from openai import AsyncOpenAI
+
+import main
+from fake_neo4j import FakeNeo4jConnection
+from fake_openai import FakeOpenAIServer
+from graph_service import GraphDBService
+from llm_client import ResilientLLMClient
+
+GUNICORN_CONF = os.path.join(os.path.dirname(main.__file__), "gunicorn_conf.py")
+
+
+def load_gunicorn_conf():
+    spec = importlib.util.spec_from_file_location("gunicorn_conf_under_test", GUNICORN_CONF)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_sigterm_fails_readiness_before_the_server_starts_shutting_down(monkeypatch):
+    monkeypatch.setattr(main, "DRAIN_DELAY_SECONDS", 0.2)
+    monkeypatch.setattr(main.app.state, "draining", False)
+    server_handled = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+
+        def server_handler(signum, frame):
+            server_handled.append(loop.time())
+
+        original = signal.signal(signal.SIGTERM, server_handler)
+        try:
+            restore = main.install_drain_handler(loop)
+            sent_at = loop.time()
+            signal.raise_signal(signal.SIGTERM)
+            await asyncio.sleep(0)
+            assert main.app.state.draining is True
+            assert server_handled == []
+            await asyncio.sleep(0.4)
+            restore()
+            assert signal.getsignal(signal.SIGTERM) is server_handler
+        finally:
+            signal.signal(signal.SIGTERM, original)
+        return sent_at
+
+    sent_at = asyncio.run(scenario())
+    assert len(server_handled) == 1
+    assert server_handled[0] - sent_at >= 0.2
+
+
+def test_drain_handler_leaves_default_sigterm_alone():
+    original = signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        restore = asyncio.run(_install())
+        assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+        restore()
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+
+async def _install():
+    return main.install_drain_handler(asyncio.get_running_loop())
+
+
+def start_event(user_prompt):
+    """An API Gateway HTTP API (payload format 2.0) event for POST /interaction-nodes/start."""
+    path = "/interaction-nodes/start"
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {
+            "host": "test.execute-api.us-east-1.amazonaws.com",
+            "x-user-id": "user-1",
+            "content-type": "application/json",
+        },
+        "requestContext": {
+            "http": {
+                "method": "POST",
+                "path": path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+            },
+            "requestId": "test",
+            "routeKey": "$default",
+            "stage": "$default",
+        },
+        "body": json.dumps({"user_prompt": user_prompt}),
+        "isBase64Encoded": False,
+    }
+
+
+class LambdaContext:
+    function_name = "test"
+    aws_request_id = "test"
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def test_warm_lambda_instance_keeps_its_clients_across_invocations(monkeypatch):
+    server = FakeOpenAIServer().start()
+    # Mangum drives every invocation on the thread's current event loop.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    openai_client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+    monkeypatch.setattr(main, "openai_client", openai_client)
+    monkeypatch.setattr(main, "llm_client", ResilientLLMClient(openai_client, model="primary"))
+    conn = FakeNeo4jConnection()
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+    try:
+        for prompt in ("First?", "Second?"):
+            response = main.handler(start_event(prompt), LambdaContext())
+            assert response["statusCode"] == 201, response["body"]
+        assert server.request_count("primary") == 2
+        assert not openai_client.is_closed()
+    finally:
+        main.app.dependency_overrides.clear()
+        loop.run_until_complete(openai_client.close())
+        loop.close()
+        asyncio.set_event_loop(None)
+        server.stop()
+
+
+def test_workers_default_to_one_while_tree_events_are_in_process(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("TREE_EVENTS_ENABLED", raising=False)
+    monkeypatch.delenv("TREE_EVENTS_REDIS_URL", raising=False)
+    assert load_gunicorn_conf().workers == 1
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(RuntimeError, match="TREE_EVENTS_REDIS_URL"):
+        load_gunicorn_conf()
+
+    monkeypatch.setenv("TREE_EVENTS_REDIS_URL", "redis://localhost:6379/0")
+    assert load_gunicorn_conf().workers == 4
+
+
+def test_workers_follow_usable_cpus_capped_when_tree_events_are_off(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setenv("TREE_EVENTS_ENABLED", "false")
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(64)))
+    monkeypatch.setenv("MAX_WORKERS", "6")
+    conf = load_gunicorn_conf()
+    assert conf.workers == min(conf.available_cpus(), 6)
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert load_gunicorn_conf().workers == 3
+
+
+def test_available_cpus_honours_the_cgroup_quota(monkeypatch):
+    conf = load_gunicorn_conf()
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(64)))
+    real_open = open
+
+    def fake_open(path, *args, **kwargs):
+        if path == "/sys/fs/cgroup/cpu.max":
+            from io import StringIO
+
+            return StringIO("250000 100000\n")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", fake_open)
+    assert conf.available_cpus() == 3
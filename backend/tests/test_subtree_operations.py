@@ -0,0 +1,191 @@
+# backend/tests/test_subtree_operations.py
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import models
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService, RevisionConflictError
+
+
+def seed(conn, parents):
+    """Seeds a stamped tree from {node_id: parent_id}; the root maps to None."""
+    ancestors = {}
+    for node_id, parent_id in parents.items():
+        ancestors[node_id] = [] if parent_id is None else ancestors[parent_id] + [parent_id]
+        conn.add_node(
+            node_id,
+            root_id=ancestors[node_id][0] if parent_id else node_id,
+            depth=len(ancestors[node_id]),
+            ancestor_ids=ancestors[node_id],
+            revision=1,
+            is_starting_node=parent_id is None,
+        )
+        if parent_id is not None:
+            conn.add_edge(parent_id, node_id)
+    root_id = next(node_id for node_id, parent_id in parents.items() if parent_id is None)
+    conn.nodes[root_id]["tree_revision"] = 1
+    return conn
+
+
+TREE = {"r": None, "a": "r", "a1": "a", "a2": "a1", "a3": "a1", "b": "r"}
+
+
+def test_copy_remaps_ancestors_below_copied_root():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    service = GraphDBService(conn)
+
+    result = asyncio.run(service.copy_subtree("a1", "user-1", "b", copy_id="c1"))
+    assert result.completed and result.processed == 3
+
+    copy_root = conn.nodes[result.new_node_id]
+    assert copy_root["ancestor_ids"] == ["r", "b"]
+    assert copy_root["depth"] == 2
+    copies = [
+        n for n in conn.nodes.values()
+        if n["node_id"] not in TREE and n["node_id"] != copy_root["node_id"]
+    ]
+    assert len(copies) == 2
+    for n in copies:
+        # a2/a3 sat at ancestor_ids[source_depth:] == ["a1"], now the copy of a1.
+        assert n["ancestor_ids"] == ["r", "b", copy_root["node_id"]]
+        assert n["depth"] == 3
+        assert n["root_id"] == "r"
+        assert {"source": copy_root["node_id"], "target": n["node_id"]} in [
+            {"source": e["source"], "target": e["target"]} for e in conn.edges
+        ]
+    assert conn.nodes["r"]["tree_revision"] == 2
+
+
+def test_copy_is_idempotent_per_copy_id():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    service = GraphDBService(conn)
+
+    first = asyncio.run(service.copy_subtree("a", "user-1", "b", copy_id="c1"))
+    node_count, edge_count = len(conn.nodes), len(conn.edges)
+    again = asyncio.run(service.copy_subtree("a", "user-1", "b", copy_id="c1"))
+    assert again.new_node_id == first.new_node_id
+    assert (len(conn.nodes), len(conn.edges)) == (node_count, edge_count)
+
+    other = asyncio.run(service.copy_subtree("a", "user-1", "b", copy_id="c2"))
+    assert other.new_node_id != first.new_node_id
+    assert len(conn.nodes) == node_count + 4
+
+
+def test_copy_under_missing_parent_raises():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    with pytest.raises(ValueError):
+        asyncio.run(GraphDBService(conn).copy_subtree("a", "user-1", "nope"))
+    assert asyncio.run(GraphDBService(conn).copy_subtree("nope", "user-1", "b")) is None
+
+
+def wide_tree():
+    # r -> x -> 4 children -> 3 grandchildren each (16 nodes below x).
+    parents = {"r": None, "x": "r"}
+    for i in range(4):
+        parents[f"c{i}"] = "x"
+        for j in range(3):
+            parents[f"c{i}g{j}"] = f"c{i}"
+    return parents
+
+
+def assert_connected(conn):
+    targets = {e["target"] for e in conn.edges}
+    for node in conn.nodes.values():
+        if node["depth"]:
+            assert node["node_id"] in targets
+
+
+def test_prune_deletes_deepest_first_in_bounded_batches():
+    conn = seed(FakeNeo4jConnection(), wide_tree())
+    service = GraphDBService(conn)
+
+    result = asyncio.run(service.prune_subtree("x", "user-1", batch_size=5))
+
+    assert result.completed and result.processed == 17
+    assert set(conn.nodes) == {"r"}
+    assert [len(batch) for batch in conn.deleted_batches] == [5, 5, 5, 1]
+    depths = [depth for batch in conn.deleted_batches for depth in batch]
+    assert depths == sorted(depths, reverse=True)
+    # One tree_revision bump per descendant batch plus one for x itself.
+    assert conn.nodes["r"]["tree_revision"] == 1 + 4 + 1
+
+
+def test_prune_stopped_by_max_batches_resumes_and_invalidates():
+    conn = seed(FakeNeo4jConnection(), wide_tree())
+    service = GraphDBService(conn)
+
+    partial = asyncio.run(
+        service.prune_subtree("x", "user-1", batch_size=4, max_batches=2)
+    )
+    assert not partial.completed and partial.processed == 8
+    assert "x" in conn.nodes
+    assert_connected(conn)
+    # The stopped prune already changed the tree, so cached reads must miss.
+    assert conn.nodes["r"]["tree_revision"] == 3
+
+    resumed = asyncio.run(service.prune_subtree("x", "user-1", batch_size=4))
+    assert resumed.completed and resumed.processed == 9
+    assert set(conn.nodes) == {"r"}
+
+
+def test_prune_of_missing_node_is_none():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    assert asyncio.run(GraphDBService(conn).prune_subtree("a", "user-2")) is None
+    assert len(conn.nodes) == len(TREE)
+
+
+def test_update_bumps_revisions_and_rejects_stale_expected_revision():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    service = GraphDBService(conn)
+
+    updated = asyncio.run(
+        service.update_interaction_node(
+            "a", "user-1",
+            models.InteractionNodeUpdate(summary_title="New", expected_revision=1),
+        )
+    )
+    assert updated.summary_title == "New" and updated.revision == 2
+    assert conn.nodes["r"]["tree_revision"] == 2
+
+    with pytest.raises(RevisionConflictError):
+        asyncio.run(
+            service.update_interaction_node(
+                "a", "user-1",
+                models.InteractionNodeUpdate(summary_title="Late", expected_revision=1),
+            )
+        )
+    assert conn.nodes["a"]["summary_title"] == "New"
+
+
+def test_patch_with_wrong_expected_revision_is_409():
+    conn = seed(FakeNeo4jConnection(), TREE)
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+    try:
+        client = TestClient(main.app)
+        headers = {"X-User-ID": "user-1"}
+        ok = client.patch(
+            "/interaction-nodes/a",
+            json={"summary_title": "New", "expected_revision": 1},
+            headers=headers,
+        )
+        assert ok.status_code == 200
+        assert ok.json()["revision"] == 2
+
+        stale = client.patch(
+            "/interaction-nodes/a",
+            json={"summary_title": "Late", "expected_revision": 1},
+            headers=headers,
+        )
+        assert stale.status_code == 409
+
+        missing = client.patch(
+            "/interaction-nodes/nope",
+            json={"summary_title": "x", "expected_revision": 1},
+            headers=headers,
+        )
+        assert missing.status_code == 404
+    finally:
+        main.app.dependency_overrides.clear()
@@ -0,0 +1,140 @@
+# backend/tests/test_tree_events.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+import main
+from fake_neo4j import FakeNeo4jConnection
+from graph_service import GraphDBService
+from tree_events import InMemoryBroker, RedisBroker, TreeEventBroker, TreeEventHub
+
+
+def test_broker_interface_is_abstract():
+    with pytest.raises(TypeError):
+        TreeEventBroker()
+
+
+def test_shared_broker_fans_out_across_hubs():
+    async def scenario():
+        broker = InMemoryBroker()
+        publisher, watcher = TreeEventHub(broker), TreeEventHub(broker)
+        assert not await publisher.has_subscribers("t1")
+        async with watcher.subscribe("t1") as subscription:
+            assert await publisher.has_subscribers("t1")
+            assert not await publisher.has_subscribers("t2")
+            await publisher.publish("t1", "node.created", {"node_id": "n"})
+            await publisher.publish("t2", "node.created", {"node_id": "other"})
+            assert await subscription.get() == {
+                "type": "node.created",
+                "data": {"node_id": "n"},
+            }
+            assert subscription.queue.empty()
+        assert not await publisher.has_subscribers("t1")
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_cut_off_after_queue_fills():
+    async def scenario():
+        hub = TreeEventHub(InMemoryBroker(), queue_size=3)
+        async with hub.subscribe("t1") as subscription:
+            for i in range(5):
+                await hub.publish("t1", "token", {"i": i})
+            assert subscription.overflowed
+            assert await subscription.get() is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_broker_fans_out_across_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        # Each broker has its own connection, as each worker process would.
+        publisher = TreeEventHub(RedisBroker(client=fakeredis.FakeAsyncRedis(server=server)))
+        watcher = TreeEventHub(RedisBroker(client=fakeredis.FakeAsyncRedis(server=server)))
+        assert not await publisher.has_subscribers("t1")
+        async with watcher.subscribe("t1") as subscription:
+            async with watcher.subscribe("t1"):
+                assert await publisher.has_subscribers("t1")
+            assert await publisher.has_subscribers("t1")
+            assert not await publisher.has_subscribers("t2")
+            await publisher.publish("t2", "node.created", {"node_id": "other"})
+            await publisher.publish("t1", "node.created", {"node_id": "n"})
+            event = await asyncio.wait_for(subscription.get(), timeout=5)
+            assert event == {"type": "node.created", "data": {"node_id": "n"}}
+            assert subscription.queue.empty()
+        assert not await publisher.has_subscribers("t1")
+
+    asyncio.run(scenario())
+
+
+class RecordingLLMClient:
+    """Stands in for ResilientLLMClient and streams two deltas when asked to."""
+
+    def __init__(self):
+        self.streamed = []
+
+    async def create_chat_completion(self, messages, on_delta=None, **kwargs):
+        self.streamed.append(on_delta is not None)
+        if on_delta is not None:
+            await on_delta("Hello ", 0)
+            await on_delta("there", 0)
+        return SimpleNamespace(
+            model="stub",
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Hello there"))],
+        )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    conn = FakeNeo4jConnection()
+    conn.add_node(
+        "r", root_id="r", depth=0, ancestor_ids=[], revision=1,
+        tree_revision=1, is_starting_node=True,
+    )
+    llm = RecordingLLMClient()
+    monkeypatch.setattr(main, "llm_client", llm)
+    # The lifespan closes the OpenAI client on exit; keep the shared one open.
+    monkeypatch.setattr(main, "openai_client", AsyncOpenAI(api_key="test"))
+    monkeypatch.setattr(main, "get_db_connection", lambda: None)
+    main.app.dependency_overrides[main.get_graph_service] = lambda: GraphDBService(conn)
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client, llm
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_branch_without_subscribers_does_not_stream(client):
+    test_client, llm = client
+    response = test_client.post(
+        "/interaction-nodes/r/branch",
+        json={"user_prompt": "Why?"},
+        headers={"X-User-ID": "user-1"},
+    )
+    assert response.status_code == 201
+    # Not streaming leaves the LLM client free to hedge.
+    assert llm.streamed == [False]
+
+
+def test_branch_streams_tokens_to_subscribers(client):
+    test_client, llm = client
+    with test_client.websocket_connect("/ws/trees/r?user_id=user-1") as websocket:
+        response = test_client.post(
+            "/interaction-nodes/r/branch",
+            json={"user_prompt": "Why?"},
+            headers={"X-User-ID": "user-1"},
+        )
+        assert response.status_code == 201
+        events = [websocket.receive_json() for _ in range(4)]
+
+    assert llm.streamed == [True]
+    assert [e["type"] for e in events] == ["token", "token", "node.created", "edge.created"]
+    assert "".join(e["data"]["delta"] for e in events[:2]) == "Hello there"
+    assert events[2]["data"]["node_id"] == response.json()["node_id"]
@@ -0,0 +1,224 @@
+# backend/tree_events.py
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set
+
+# Events a slow subscriber may have queued before it is disconnected. Clients
+# that fall this far behind should reconnect and refetch the graph.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# InMemoryBroker only reaches subscribers of the process that handled the write,
+# so live updates are only correct with a single worker. Multi-worker servers
+# must either set TREE_EVENTS_REDIS_URL, which shares events between processes
+# through Redis pub/sub, or turn live updates off with TREE_EVENTS_ENABLED=false.
+TREE_EVENTS_ENABLED = os.environ.get("TREE_EVENTS_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+class TreeEventBroker(ABC):
+    """
+    Transport that carries tree events between hubs. Every worker process owns
+    one TreeEventHub; the broker delivers each published event to all attached
+    hubs so subscribers connected to any worker see it. Implementations backed
+    by an external pub/sub (e.g. Redis) subclass this.
+    """
+
+    @abstractmethod
+    def attach(self, hub: "TreeEventHub"):
+        """Registers a hub to receive every event published through the broker."""
+
+    @abstractmethod
+    async def publish(self, root_id: str, event: Dict[str, Any]):
+        """Delivers an event for the tree rooted at root_id to all attached hubs."""
+
+    @abstractmethod
+    async def has_subscribers(self, root_id: str) -> bool:
+        """True if any attached hub has a subscriber for the tree."""
+
+    async def watch(self, root_id: str):
+        """Called when a hub gains a subscriber for the tree."""
+
+    async def unwatch(self, root_id: str):
+        """Called when a hub loses a subscriber for the tree."""
+
+
+class InMemoryBroker(TreeEventBroker):
+    """
+    Broker for a single process. Attaching several hubs to one instance stands
+    in for several workers sharing an external broker.
+    """
+
+    def __init__(self):
+        self._hubs: List["TreeEventHub"] = []
+
+    def attach(self, hub: "TreeEventHub"):
+        self._hubs.append(hub)
+
+    async def publish(self, root_id: str, event: Dict[str, Any]):
+        for hub in self._hubs:
+            hub.deliver(root_id, event)
+
+    async def has_subscribers(self, root_id: str) -> bool:
+        return any(hub.local_subscriber_count(root_id) for hub in self._hubs)
+
+
+class RedisBroker(TreeEventBroker):
+    """
+    Broker shared by all worker processes through Redis pub/sub, one channel per
+    tree. A process subscribes to a tree's channel only while one of its hubs
+    has a subscriber for it, so the channel's subscriber count answers
+    has_subscribers for the whole deployment.
+    """
+
+    CHANNEL_PREFIX = "tree-events:"
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.Redis.from_url(url)
+        self._redis = client
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._hubs: List["TreeEventHub"] = []
+        self._watch_counts: Dict[str, int] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    def _channel(self, root_id: str) -> str:
+        return self.CHANNEL_PREFIX + root_id
+
+    def attach(self, hub: "TreeEventHub"):
+        self._hubs.append(hub)
+
+    async def publish(self, root_id: str, event: Dict[str, Any]):
+        await self._redis.publish(self._channel(root_id), json.dumps(event))
+
+    async def has_subscribers(self, root_id: str) -> bool:
+        counts = await self._redis.pubsub_numsub(self._channel(root_id))
+        return bool(counts and counts[0][1])
+
+    async def watch(self, root_id: str):
+        self._watch_counts[root_id] = self._watch_counts.get(root_id, 0) + 1
+        if self._watch_counts[root_id] == 1:
+            await self._pubsub.subscribe(self._channel(root_id))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.ensure_future(self._read())
+
+    async def unwatch(self, root_id: str):
+        self._watch_counts[root_id] -= 1
+        if not self._watch_counts[root_id]:
+            del self._watch_counts[root_id]
+            await self._pubsub.unsubscribe(self._channel(root_id))
+
+    async def _read(self):
+        """Hands channel messages to the attached hubs while any tree is watched."""
+        while self._watch_counts:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except Exception as e:
+                # The pub/sub connection re-subscribes when it reconnects.
+                print(f"TreeEventBroker Error: Reading from Redis failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode("utf-8")
+            root_id = channel[len(self.CHANNEL_PREFIX):]
+            event = json.loads(message["data"])
+            for hub in self._hubs:
+                hub.deliver(root_id, event)
+
+
+def create_broker_from_env() -> TreeEventBroker:
+    """
+    Returns a RedisBroker when TREE_EVENTS_REDIS_URL is set, otherwise a broker
+    that only reaches this process.
+    """
+    url = os.environ.get("TREE_EVENTS_REDIS_URL")
+    if url:
+        return RedisBroker(url)
+    return InMemoryBroker()
+
+
+class Subscription:
+    """A single subscriber's bounded event queue for one tree."""
+
+    def __init__(self, root_id: str, maxsize: int):
+        self.root_id = root_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Dropping individual events would leave the client with a silently
+            # inconsistent tree, so mark it and let the consumer disconnect it.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """Returns the next event, or None once the subscriber has overflowed."""
+        return await self.queue.get()
+
+
+class TreeEventHub:
+    """In-process fan-out of tree events to WebSocket subscribers, keyed by root_id."""
+
+    def __init__(
+        self, broker: TreeEventBroker, queue_size: int = SUBSCRIBER_QUEUE_SIZE
+    ):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        broker.attach(self)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    def local_subscriber_count(self, root_id: str) -> int:
+        return len(self._subscriptions.get(root_id, ()))
+
+    async def has_subscribers(self, root_id: str) -> bool:
+        """True if anyone, on any hub sharing the broker, watches the tree."""
+        return await self.broker.has_subscribers(root_id)
+
+    @asynccontextmanager
+    async def subscribe(self, root_id: str):
+        subscription = Subscription(root_id, self.queue_size)
+        self._subscriptions.setdefault(root_id, set()).add(subscription)
+        try:
+            await self.broker.watch(root_id)
+            try:
+                yield subscription
+            finally:
+                await self.broker.unwatch(root_id)
+        finally:
+            subs = self._subscriptions.get(root_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscriptions[root_id]
+
+    async def publish(self, root_id: str, event_type: str, data: Dict[str, Any]):
+        """Publishes an event for the tree rooted at root_id through the broker."""
+        await self.broker.publish(root_id, {"type": event_type, "data": data})
+
+    def deliver(self, root_id: str, event: Dict[str, Any]):
+        """Called by the broker to hand an event to this hub's local subscribers."""
+        for subscription in list(self._subscriptions.get(root_id, ())):
+            subscription.offer(event)
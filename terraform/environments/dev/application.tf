@@ -109,7 +109,7 @@ resource "aws_lambda_function" "fastapi_lambda" {
   role          = aws_iam_role.lambda_execution_role.arn
   package_type  = "Image"
   image_uri     = "${aws_ecr_repository.backend_api_repo.repository_url}:latest"
-  timeout       = 30
+  timeout       = 30 # LLM_DEADLINE_SECONDS (backend/llm_client.py) must stay below this.
   memory_size   = 512
   architectures = ["arm64"]
 